@@ -70,6 +70,8 @@
  * @property {{lat: number, lon: number}} pharr_coords
  * @property {GeometryTransform} transform
  * @property {SegmentGeometry[]} segments_in_roi
+ * @property {object} [segmentMetrics] - Client-side only: geometry.segmetrics.json sidecar
+ *   (overlay/segmentMetrics.js), attached by the loader when its transform matches
  */
 
 /**
@@ -1,13 +1,117 @@
 """
 Mission-critical logging server for CIEN/FIELD documentation.
 Filters noise, keeps only essential state transitions.
+
+Requests are handled on a threaded server; accepted lines go into a bounded
+in-memory queue drained by a single writer thread that keeps the log file
+open and flushes on size or time thresholds. GET /stats reports queue
+counters (accepted, written, dropped, ...).
+
+CRITICAL_PATTERNS is compiled into one regex alternation; GET /patterns shows
+it, POST /patterns replaces it (JSON array) and POST /patterns/reload re-reads
+--patterns-file. With --coalesce, runs of consecutive measurement lines
+(containing one of COALESCE_PATTERNS or --coalesce-pattern) that differ only
+in their numbers (e.g. "Layer B alpha: 0.00x") are folded into one record.
+Other lines (Queue hour, phase, STARTED/ENDED, ...) are state transitions and
+are always written one by one with their own timestamps:
+
+    [22:07:58.798] [Director] Layer B alpha: 0.000 {x26 until 22:08:00.062 | min 0.000 | max 0.015 | last 0.015}
+
+With --rotate-bytes / --rotate-seconds the active log is sealed into gzip
+segments under --segment-dir, indexed by time range and per-pattern line
+counts. GET /log?since=&until=&pattern=&limit= reads only the segments whose
+index entries can contain matches:
+
+    /log?since=-60&pattern=[Director]       last minute of Director lines
+    /log?since=2026-01-03T22:00&limit=200   newest 200 lines since 22:00
+
+GET /log/stream is a Server-Sent Events live tail of accepted lines, with an
+optional ?pattern= filter and Last-Event-ID (or ?last_id=) resume from a
+ring buffer of recent lines (reset by /clear, which is kept in the buffer
+as a "clear" event). Each subscriber has its own bounded queue: a
+slow tab loses its oldest lines (reported as a "dropped" event) instead of
+stalling ingestion.
+
+Lines matching METRIC_TEMPLATES (or --metric-templates) are also parsed into
+(timestamp, series, tags, value) samples and appended in batches to a SQLite
+store (--metrics-db). GET /metrics/series lists series; GET /metrics/query
+returns one series downsampled into time buckets:
+
+    /metrics/query?series=layer_b_alpha&since=-3600&step=10&agg=last
+    /metrics/query?series=ctrl_phi.delta&tag.scenario=Baseline
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from collections import deque
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import gzip
 import json
-from datetime import datetime
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
 
 LOGFILE = "mission_critical.log"
+PORT = 9999
+
+# Writer thread defaults
+QUEUE_SIZE = 10_000          # max lines waiting for the writer
+FLUSH_BYTES = 64 * 1024      # flush once this much is buffered...
+FLUSH_INTERVAL = 0.5         # ...or this many seconds after the last flush
+BLOCK_TIMEOUT = 2.0          # "block" policy: max wait for queue space per request
+FULL_POLICIES = ("drop-oldest", "block")
+
+# Coalescing: emit a pending run after this much idle time or total age
+COALESCE_IDLE = 2.0
+COALESCE_MAX_AGE = 10.0
+# Only lines containing one of these are folded: numbers there are measurements
+COALESCE_PATTERNS = ["alpha:"]
+
+# Client timestamps (epoch ms) outside this range are replaced by server time
+CLIENT_TS_MIN_MS = 946_684_800_000     # 2000-01-01
+CLIENT_TS_MAX_MS = 4_102_444_800_000   # 2100-01-01
+
+# Query defaults
+QUERY_LIMIT = 1000
+
+# Metric store
+METRICS_BATCH = 500          # samples per insert transaction (also flushed with the log)
+METRICS_MAX_POINTS = 500     # default number of buckets when ?step= is omitted
+METRIC_AGGREGATES = {"avg": "AVG(value)", "min": "MIN(value)", "max": "MAX(value)",
+                     "sum": "SUM(value)", "count": "COUNT(*)", "last": "value"}
+
+# Line templates -> samples. "regex" templates read the named group "value"
+# (or several "v_<name>" groups -> "<series>.<name>"); every other named group
+# becomes a tag. "kv" templates take every numeric key=value pair on lines
+# containing "match" -> "<series>.<key>". First matching template wins.
+METRIC_TEMPLATES = [
+    {"series": "layer_b_alpha", "regex": r"Layer B alpha: (?P<value>-?\d+(?:\.\d+)?)"},
+    {"series": "scenario_alpha", "regex": r"Scenario alpha: (?P<value>-?\d+(?:\.\d+)?)"},
+    {"series": "queue_hour", "regex": r"Queue hour: (?P<value>\d+)"},
+    {"series": "build_routing_s", "regex": r"\[BUILD\] Routing complete v\d+ \((?P<value>\d+(?:\.\d+)?)s\)"},
+    {"series": "build_lots", "regex": r"\[BUILD\] Lot routing: (?P<v_available>\d+) available, "
+                                      r"(?P<v_full>\d+) full, (?P<v_draining>\d+) draining, "
+                                      r"(?P<v_cooldown>\d+) cooldown"},
+    {"series": "build_cells", "match": "[BUILD] roadCells=", "kv": True},
+    {"series": "ctrl_phi", "regex": r"\[CTRL\]\[PHI\]\[(?P<scenario>[^\]]+)\].*?delta=(?P<value>[-+]?\d+(?:\.\d+)?)"},
+    {"series": "lot_fills", "match": "[LOT FILLS]", "kv": True},
+    {"series": "sab", "match": "[SAB", "kv": True},
+    {"series": "phi_ms", "regex": r"\[PHI\].*?(?P<value>\d+(?:\.\d+)?)\s*ms\b"},
+    {"series": "rebuild", "match": "[REBUILD", "kv": True},
+]
+
+KV_RE = re.compile(r"([A-Za-z_][\w.]*)=([-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)(?![\w.])")
+
+# Live tail (SSE)
+STREAM_HISTORY = 2000        # recent lines kept for Last-Event-ID resume
+STREAM_CLIENT_QUEUE = 1000   # per-subscriber backlog before dropping oldest
+STREAM_KEEPALIVE = 15.0      # comment ping interval on idle streams
 
 # Only log messages containing these patterns
 CRITICAL_PATTERNS = [
@@ -32,52 +136,1063 @@ CRITICAL_PATTERNS = [
     "lot admission",
 ]
 
+
+class PatternFilter:
+    """CRITICAL_PATTERNS compiled into a single alternation, swappable at runtime."""
+
+    def __init__(self, patterns, path=None):
+        self.path = path
+        self.set(patterns)
+
+    def set(self, patterns):
+        patterns = [p for p in patterns if p]
+        # Longest first so tags() reports the most specific pattern
+        alternation = "|".join(re.escape(p) for p in sorted(patterns, key=len, reverse=True))
+        # Build fully before swapping: readers never see a half-updated filter
+        self._state = (list(patterns), re.compile(alternation) if patterns else None)
+        self.version = getattr(self, "version", 0) + 1
+
+    def reload(self):
+        """Re-read the patterns file (one pattern per line, # comments)."""
+        if not self.path:
+            raise ValueError("no --patterns-file configured")
+        with open(self.path, encoding="utf-8") as f:
+            self.set([l.strip() for l in f if l.strip() and not l.lstrip().startswith("#")])
+        return self.patterns
+
+    @property
+    def patterns(self):
+        return self._state[0]
+
+    def search(self, msg):
+        """First matching pattern, or None."""
+        regex = self._state[1]
+        m = regex.search(msg) if regex else None
+        return m.group(0) if m else None
+
+    def tags(self, msg):
+        """Every pattern contained in msg (exact, for indexing off the request path)."""
+        return [p for p in self._state[0] if p in msg]
+
+
+FILTER = PatternFilter(CRITICAL_PATTERNS)
+
+NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+
+
+class Coalescer:
+    """
+    Folds consecutive measurement lines (containing one of `patterns`) with
+    the same template (numbers replaced by #) into one record with count,
+    first/last timestamp and min/max/last of each numeric field. Single
+    lines and lines without a measurement pattern pass through unchanged.
+    Timestamps are epoch seconds.
+    """
+
+    def __init__(self, idle=COALESCE_IDLE, max_age=COALESCE_MAX_AGE, patterns=COALESCE_PATTERNS):
+        self.idle = idle
+        self.max_age = max_age
+        self.patterns = list(patterns)
+        self.folded = 0
+        self.reset()
+
+    def reset(self):
+        self._template = None
+        self._first = None      # (ts, msg)
+        self._last_ts = None
+        self._values = None     # [(min, max, last)] as (float, str) pairs
+        self._count = 0
+        self._started = self._touched = 0.0
+
+    def add(self, ts, msg):
+        """Feed one line; returns the records that are complete."""
+        if not any(p in msg for p in self.patterns):
+            return self.drain() + [(ts, msg)]
+        numbers = NUMBER_RE.findall(msg)
+        template = NUMBER_RE.sub("#", msg)
+        now = time.monotonic()
+
+        if template == self._template:
+            self._count += 1
+            self._last_ts = ts
+            self._touched = now
+            for i, text in enumerate(numbers):
+                v = (float(text), text)
+                lo, hi, _ = self._values[i]
+                self._values[i] = (min(lo, v), max(hi, v), v)
+            return []
+
+        out = self.drain()
+        self._template = template
+        self._first = (ts, msg)
+        self._last_ts = ts
+        self._values = [((float(t), t),) * 3 for t in numbers]
+        self._count = 1
+        self._started = self._touched = now
+        return out
+
+    @property
+    def pending(self):
+        return self._count
+
+    def poll(self):
+        """Emit the pending run if it has gone idle or grown too old."""
+        if not self._count:
+            return []
+        now = time.monotonic()
+        if now - self._touched >= self.idle or now - self._started >= self.max_age:
+            return self.drain()
+        return []
+
+    def drain(self):
+        if not self._count:
+            return []
+        ts, msg = self._first
+        if self._count > 1:
+            self.folded += self._count - 1
+            fields = [f"x{self._count} until {format_ts(self._last_ts * 1000)}"]
+            if self._values:
+                for label, k in (("min", 0), ("max", 1), ("last", 2)):
+                    fields.append(f"{label} " + "/".join(v[k][1] for v in self._values))
+            msg = f"{msg} {{{' | '.join(fields)}}}"
+        self.reset()
+        return [(ts, msg)]
+
+
+def format_ts(ts_ms=None):
+    """HH:MM:SS.mmm for a client epoch-ms timestamp, or for now."""
+    dt = datetime.fromtimestamp(ts_ms / 1000) if ts_ms is not None else datetime.now()
+    return dt.strftime("%H:%M:%S.%f")[:-3]
+
+
+def client_ts(ts):
+    """
+    A client "ts" as epoch ms, or None (use server time) when it is missing,
+    not a number, not finite or outside CLIENT_TS_MIN_MS..CLIENT_TS_MAX_MS.
+    """
+    if ts is None or isinstance(ts, bool):
+        return None
+    try:
+        ts = float(ts)
+    except (TypeError, ValueError):
+        return None
+    if not CLIENT_TS_MIN_MS <= ts <= CLIENT_TS_MAX_MS:  # also rejects nan/inf
+        return None
+    return ts
+
+
+def parse_batch(body):
+    """
+    Parse a /log/batch body into [(msg, ts_ms)].
+    Accepts a JSON array or NDJSON; entries are {"msg", "ts"} objects or bare strings.
+    Invalid timestamps become None (see client_ts).
+    """
+    text = body.strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        items = json.loads(text)
+    else:
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    entries = []
+    for item in items:
+        if isinstance(item, str):
+            entries.append((item, None))
+        else:
+            entries.append((str(item.get("msg", "")), client_ts(item.get("ts"))))
+    return entries
+
+
+def parse_time(value, now=None):
+    """
+    Query time: negative seconds are relative to now ("-60"), other numbers
+    are epoch seconds (or ms if > 1e12), anything else is ISO 8601.
+    """
+    if value is None or value == "":
+        return None
+    now = time.time() if now is None else now
+    try:
+        t = float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    if t < 0:
+        return now + t
+    return t / 1000 if t > 1e12 else t
+
+
+LINE_RE = re.compile(r"^\[(\d\d):(\d\d):(\d\d)\.(\d{3})\] ")
+
+
+def line_times(lines, end):
+    """
+    Epoch time of each "[HH:MM:SS.mmm] ..." line. Lines only carry the time
+    of day, so dates are reconstructed backwards from the segment's end time,
+    stepping back a day whenever the clock jumps forward by more than 12h.
+    Unparseable lines get None.
+    """
+    times = [None] * len(lines)
+    day = datetime.fromtimestamp(end).replace(hour=0, minute=0, second=0, microsecond=0)
+    prev_tod = None
+    for i in range(len(lines) - 1, -1, -1):
+        m = LINE_RE.match(lines[i])
+        if not m:
+            continue
+        h, mi, sec, ms = (int(g) for g in m.groups())
+        tod = h * 3600 + mi * 60 + sec + ms / 1000
+        if prev_tod is not None and tod - prev_tod > 12 * 3600:
+            day -= timedelta(days=1)
+        prev_tod = tod
+        times[i] = day.timestamp() + tod
+    return times
+
+
+class SegmentStore:
+    """
+    Sealed log segments (<stem>.<YYYYmmdd_HHMMSS>.log.gz) plus index.json.
+
+    Each index entry records the segment's first/last line time, line count
+    and per-pattern line counts (zeros included), so queries can skip
+    segments by time range or by a pattern that never occurred. The active
+    log's entry is kept in memory and updated by the writer thread.
+    """
+
+    def __init__(self, log_path, directory=None, rotate_bytes=0, rotate_seconds=0, keep=0):
+        self.log_path = Path(log_path)
+        self.dir = Path(directory) if directory else self.log_path.with_name(self.log_path.stem + "_segments")
+        self.index_path = self.dir / "index.json"
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.segments = []
+        if self.index_path.exists():
+            with open(self.index_path, encoding="utf-8") as f:
+                self.segments = json.load(f)["segments"]
+        # Lines already in the active file were not seen by this process
+        existing = self.log_path.exists() and self.log_path.stat().st_size > 0
+        self.reset_active(known=not existing)
+
+    @property
+    def enabled(self):
+        return self.rotate_bytes > 0 or self.rotate_seconds > 0
+
+    def reset_active(self, known=True):
+        """Start a fresh index entry for the active log; returns the previous one."""
+        with self.lock:
+            previous = getattr(self, "active", None)
+            self.active = {"start": None, "end": None, "lines": 0 if known else None,
+                           "tags": {p: 0 for p in FILTER.patterns} if known else None}
+            self._filter_version = FILTER.version
+        return previous
+
+    def note(self, t, msg):
+        """Record one written line in the active segment's index entry."""
+        with self.lock:
+            a = self.active
+            if a["start"] is None or t < a["start"]:
+                a["start"] = t
+            if a["end"] is None or t > a["end"]:
+                a["end"] = t
+            if a["lines"] is not None:
+                a["lines"] += 1
+            if a["tags"] is not None:
+                if self._filter_version != FILTER.version:
+                    # Patterns changed: zero counts for dropped patterns are no longer
+                    # maintained, so stop advertising them as skippable
+                    current = set(FILTER.patterns)
+                    a["tags"] = {k: v for k, v in a["tags"].items() if v or k in current}
+                    self._filter_version = FILTER.version
+                for tag in FILTER.tags(msg):
+                    a["tags"][tag] = a["tags"].get(tag, 0) + 1
+
+    def should_rotate(self, size):
+        if self.rotate_bytes and size >= self.rotate_bytes:
+            return True
+        start = self.active["start"]
+        return bool(self.rotate_seconds and start and time.time() - start >= self.rotate_seconds)
+
+    def seal(self):
+        """Compress the (closed) active log into a segment and index it."""
+        size = self.log_path.stat().st_size if self.log_path.exists() else 0
+        meta = self.reset_active()
+        if size == 0:
+            return None
+
+        end = meta["end"] or self.log_path.stat().st_mtime
+        stamp = datetime.fromtimestamp(meta["start"] or end).strftime("%Y%m%d_%H%M%S")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        name = f"{self.log_path.stem}.{stamp}.log.gz"
+        n = 1
+        while (self.dir / name).exists():
+            n += 1
+            name = f"{self.log_path.stem}.{stamp}_{n}.log.gz"
+
+        with open(self.log_path, "rb") as src, gzip.open(self.dir / name, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+        entry = dict(meta, file=name, end=end, bytes=size)
+        with self.lock:
+            self.segments.append(entry)
+            if self.keep and len(self.segments) > self.keep:
+                for old in self.segments[:-self.keep]:
+                    (self.dir / old["file"]).unlink(missing_ok=True)
+                self.segments = self.segments[-self.keep:]
+            self._save_index()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Sealed segment {name} ({size / 1e6:.1f} MB)")
+        return entry
+
+    def _save_index(self):
+        tmp = self.index_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "segments": self.segments}, f, indent=1)
+        tmp.replace(self.index_path)
+
+    def query(self, since=None, until=None, pattern=None, limit=QUERY_LIMIT):
+        """Newest `limit` lines in [since, until] containing `pattern`, oldest first."""
+        with self.lock:
+            candidates = [dict(s, path=self.dir / s["file"]) for s in self.segments]
+            active = dict(self.active, path=self.log_path)
+        if self.log_path.exists():
+            if active["end"] is None:
+                active["end"] = self.log_path.stat().st_mtime
+            candidates.append(active)
+
+        found, read, skipped = [], 0, 0
+        for i in range(len(candidates) - 1, -1, -1):
+            seg = candidates[i]
+            if since is not None and seg["end"] is not None and seg["end"] < since:
+                skipped += i + 1  # segments are chronological: all older ones end earlier
+                break
+            if (until is not None and seg["start"] is not None and seg["start"] > until) or \
+                    (pattern and seg["tags"] is not None and seg["tags"].get(pattern) == 0):
+                skipped += 1
+                continue
+
+            read += 1
+            opener = gzip.open if seg["path"].suffix == ".gz" else open
+            with opener(seg["path"], "rt", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            matches = []
+            for line, t in zip(lines, line_times(lines, seg["end"])):
+                if t is None or (since is not None and t < since) or (until is not None and t > until):
+                    continue
+                if pattern and pattern not in line:
+                    continue
+                matches.append(line)
+            found = matches + found
+            if limit and len(found) >= limit:
+                break
+
+        if limit:
+            found = found[-limit:]
+        return {"lines": found, "segments_read": read, "segments_skipped": skipped}
+
+
+class MetricExtractor:
+    """Compiled METRIC_TEMPLATES; extract() turns one line into samples."""
+
+    def __init__(self, templates=METRIC_TEMPLATES):
+        self.templates = []
+        for t in templates:
+            if "regex" in t:
+                self.templates.append((t["series"], re.compile(t["regex"]), None, t.get("tags", {})))
+            elif t.get("kv"):
+                self.templates.append((t["series"], None, t["match"], t.get("tags", {})))
+            else:
+                raise ValueError(f"template {t.get('series')!r} needs 'regex' or 'kv'")
+
+    def extract(self, t, msg):
+        """[(ts, series, tags_json, value)] for the first template that matches."""
+        for series, regex, match, static_tags in self.templates:
+            if regex is not None:
+                m = regex.search(msg)
+                if not m:
+                    continue
+                groups = m.groupdict()
+                tags = dict(static_tags)
+                values = []
+                for name, text in groups.items():
+                    if name == "value":
+                        values.append((series, text))
+                    elif name.startswith("v_"):
+                        values.append((f"{series}.{name[2:]}", text))
+                    elif text is not None:
+                        tags[name] = text
+            else:
+                if match not in msg:
+                    continue
+                tags = dict(static_tags)
+                values = [(f"{series}.{k}", v) for k, v in KV_RE.findall(msg)]
+            tags_json = json.dumps(tags, sort_keys=True)
+            return [(t, name, tags_json, float(v)) for name, v in values if v is not None]
+        return []
+
+
+class MetricStore:
+    """
+    Append-only SQLite sample table. The writer thread owns the write
+    connection and inserts in batches; queries open their own connection
+    (WAL mode lets them read while the writer appends).
+    """
+
+    def __init__(self, path, extractor=None):
+        self.path = str(path)
+        self.extractor = extractor or MetricExtractor()
+        self.pending = []
+        self.inserted = 0
+        self._conn = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS samples "
+                     "(ts REAL NOT NULL, series TEXT NOT NULL, tags TEXT NOT NULL, value REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS samples_series_ts ON samples (series, ts)")
+        conn.commit()
+        return conn
+
+    def add(self, t, msg):
+        """Writer thread: extract samples from one accepted line."""
+        self.pending.extend(self.extractor.extract(t, msg))
+        if len(self.pending) >= METRICS_BATCH:
+            self.commit()
+
+    def commit(self):
+        if not self.pending:
+            return
+        if self._conn is None:
+            self._conn = self._connect()
+        with self._conn:
+            self._conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)", self.pending)
+        self.inserted += len(self.pending)
+        self.pending = []
+
+    def close(self):
+        self.commit()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _reader(self):
+        if not os.path.exists(self.path):
+            return None
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def series(self):
+        conn = self._reader()
+        if conn is None:
+            return []
+        with conn:
+            rows = conn.execute("SELECT series, COUNT(*), MIN(ts), MAX(ts) FROM samples "
+                                "GROUP BY series ORDER BY series").fetchall()
+        conn.close()
+        return [{"series": r[0], "samples": r[1], "first": r[2], "last": r[3]} for r in rows]
+
+    def query(self, series, since=None, until=None, step=None, agg="avg", tags=None,
+              max_points=METRICS_MAX_POINTS):
+        """Downsample one series into [bucket_start, value, samples] rows."""
+        if agg not in METRIC_AGGREGATES:
+            raise ValueError(f"agg must be one of {sorted(METRIC_AGGREGATES)}")
+        where, params = ["series = ?"], [series]
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts <= ?")
+            params.append(until)
+        if tags:
+            # Untagged samples are "{}"; databases written before that hold "" (not JSON)
+            where.append("tags != ''")
+        for k, v in (tags or {}).items():
+            where.append("json_extract(tags, ?) = ?")
+            params.extend([f"$.{k}", v])
+        clause = " AND ".join(where)
+
+        conn = self._reader()
+        if conn is None:
+            return {"series": series, "step": step, "agg": agg, "points": []}
+        try:
+            if not step:
+                lo, hi = conn.execute(f"SELECT MIN(ts), MAX(ts) FROM samples WHERE {clause}", params).fetchone()
+                step = max((hi - lo) / max_points, 0.001) if lo is not None else 1.0
+            # "last": SQLite returns the bare column from the MAX(ts) row
+            rows = conn.execute(
+                f"SELECT CAST(ts / ? AS INTEGER) AS bucket, {METRIC_AGGREGATES[agg]}, COUNT(*), MAX(ts) "
+                f"FROM samples WHERE {clause} GROUP BY bucket ORDER BY bucket",
+                [step] + params).fetchall()
+        finally:
+            conn.close()
+        return {"series": series, "step": step, "agg": agg,
+                "points": [[round(b * step, 3), v, n] for b, v, n, _ in rows]}
+
+
+class Subscriber:
+    """One /log/stream client: bounded queue, drop-oldest when it falls behind."""
+
+    def __init__(self, pattern=None, maxlen=STREAM_CLIENT_QUEUE):
+        self.pattern = pattern
+        self.maxlen = maxlen
+        self.queue = deque()
+        self.dropped = 0
+        self.cond = threading.Condition()
+
+    def offer(self, event):
+        event_id, kind, data = event
+        if kind == "line" and self.pattern and self.pattern not in data:
+            return
+        with self.cond:
+            if len(self.queue) >= self.maxlen:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append(event)
+            self.cond.notify()
+
+    def take(self, timeout):
+        """Wait for events; returns (events, lines dropped since last take)."""
+        with self.cond:
+            if not self.queue:
+                self.cond.wait(timeout)
+            events, self.queue = list(self.queue), deque()
+            dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+
+class LogBroadcaster:
+    """Fans accepted lines out to live-tail subscribers; never blocks the publisher."""
+
+    def __init__(self, history=STREAM_HISTORY):
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.history = deque(maxlen=history)
+        self.subscribers = set()
+
+    def publish(self, kind, data=""):
+        with self.lock:
+            event = (self.next_id, kind, data)
+            self.next_id += 1
+            if kind == "clear":
+                # Lines before a clear are never replayed; resuming across it
+                # yields the clear event itself, then newer lines
+                self.history.clear()
+            self.history.append(event)
+            subscribers = list(self.subscribers)
+        for sub in subscribers:
+            sub.offer(event)
+
+    def subscribe(self, pattern=None, last_id=None):
+        """Register a subscriber, pre-filled with history newer than last_id."""
+        sub = Subscriber(pattern)
+        with self.lock:
+            if last_id is not None:
+                for event in self.history:
+                    if event[0] > last_id:
+                        sub.offer(event)
+            self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscribers.discard(sub)
+
+    def stats(self):
+        with self.lock:
+            return {"subscribers": len(self.subscribers), "last_id": self.next_id - 1}
+
+
+class LogWriter:
+    """
+    Bounded line queue plus one writer thread that owns the log file.
+
+    When the queue is full, "drop-oldest" discards the oldest pending line and
+    "block" makes the submitting request wait up to BLOCK_TIMEOUT for space
+    (then the line is rejected). Both outcomes are counted in stats().
+
+    clear() is queued behind in-flight lines: everything accepted before it is
+    discarded, everything accepted after it lands in the truncated file.
+    When rotation is enabled, clear() and the size/age thresholds seal the
+    active file into a compressed segment instead of discarding it.
+    """
+
+    def __init__(self, path, queue_size=QUEUE_SIZE, on_full="drop-oldest",
+                 flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL, echo=True,
+                 coalesce=False, segments=None, metrics=None, coalesce_patterns=COALESCE_PATTERNS):
+        if on_full not in FULL_POLICIES:
+            raise ValueError(f"on_full must be one of {FULL_POLICIES}")
+        self.path = path
+        self.queue_size = queue_size
+        self.on_full = on_full
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.echo = echo
+        self.coalescer = Coalescer(patterns=coalesce_patterns) if coalesce else None
+        self.segments = segments or SegmentStore(path)
+        self.stream = LogBroadcaster()
+        self.metrics = metrics
+
+        self._queue = deque()
+        self._lines_queued = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.counters = {"accepted": 0, "written": 0, "dropped": 0, "rejected": 0,
+                         "blocked": 0, "cleared": 0, "flushes": 0, "errors": 0}
+        self.max_depth = 0
+
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    # ── producer side (request threads) ──────────────────────────────────────
+
+    def submit(self, msg, ts_ms=None, deadline=None):
+        """
+        Queue one message (timestamped now unless ts_ms is given). Returns False if rejected.
+        Under "block", waits until `deadline` (time.monotonic(); default now + BLOCK_TIMEOUT),
+        so a whole batch can share one deadline.
+        """
+        ts_ms = client_ts(ts_ms)
+        line = (ts_ms / 1000 if ts_ms is not None else time.time(), msg)
+        with self._cond:
+            if self._lines_queued >= self.queue_size:
+                if self.on_full == "block":
+                    self.counters["blocked"] += 1
+                    if deadline is None:
+                        deadline = time.monotonic() + BLOCK_TIMEOUT
+                    while self._lines_queued >= self.queue_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or self._closed:
+                            self.counters["rejected"] += 1
+                            return False
+                        self._cond.wait(remaining)
+                else:
+                    self._drop_oldest()
+            self._queue.append(("line", line))
+            self._lines_queued += 1
+            self.counters["accepted"] += 1
+            self.max_depth = max(self.max_depth, self._lines_queued)
+            self._cond.notify_all()
+        self.stream.publish("line", f"[{format_ts(line[0] * 1000)}] {msg}")
+        return True
+
+    def _drop_oldest(self):
+        for i, (kind, _) in enumerate(self._queue):
+            if kind == "line":
+                del self._queue[i]
+                self._lines_queued -= 1
+                self.counters["dropped"] += 1
+                return
+
+    def clear(self, timeout=5.0):
+        """
+        Truncate the log after all previously queued lines; waits for the writer.
+        With rotation on, the current log (pending lines included) is sealed first.
+        """
+        done = threading.Event()
+        with self._cond:
+            self._queue.append(("clear", done))
+            self._cond.notify_all()
+        self.stream.publish("clear")
+        return done.wait(timeout)
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is on disk."""
+        done = threading.Event()
+        with self._cond:
+            self._queue.append(("flush", done))
+            self._cond.notify_all()
+        return done.wait(timeout)
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5.0)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.counters, queued=self._lines_queued, max_depth=self.max_depth,
+                         queue_size=self.queue_size, on_full=self.on_full,
+                         coalesced=self.coalescer.folded if self.coalescer else None)
+        stats["stream"] = self.stream.stats()
+        stats["metric_samples"] = self.metrics.inserted if self.metrics else None
+        return stats
+
+    # ── consumer side (writer thread) ─────────────────────────────────────────
+
+    def _run(self):
+        f = open(self.path, "a", encoding="utf-8")
+        buffer = []
+        buffered_bytes = 0
+        last_flush = time.monotonic()
+
+        def emit(records):
+            nonlocal buffered_bytes
+            for t, msg in records:
+                try:
+                    line = f"[{format_ts(t * 1000)}] {msg}"
+                    self.segments.note(t, msg)
+                except Exception as e:
+                    failed(e)
+                    continue
+                buffer.append(line)
+                buffered_bytes += len(line) + 1
+
+        def failed(e):
+            # One bad record must not end the writer thread
+            with self._cond:
+                self.counters["errors"] += 1
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Writer skipped a record: {e!r}")
+
+        def write_buffer(drain=False):
+            nonlocal buffer, buffered_bytes, last_flush
+            if drain and self.coalescer:
+                emit(self.coalescer.drain())
+            if buffer:
+                text = "\n".join(buffer) + "\n"
+                f.write(text)
+                f.flush()
+                if self.echo:
+                    sys.stdout.write(text)
+                    sys.stdout.flush()
+                with self._cond:
+                    self.counters["written"] += len(buffer)
+                    self.counters["flushes"] += 1
+                buffer = []
+                buffered_bytes = 0
+            if self.metrics:
+                self.metrics.commit()
+            last_flush = time.monotonic()
+
+        try:
+            while True:
+                with self._cond:
+                    if not self._queue and not self._closed:
+                        pending = buffer or (self.coalescer and self.coalescer.pending)
+                        timeout = self.flush_interval if pending else None
+                        self._cond.wait(timeout)
+                    items = self._queue
+                    self._queue = deque()
+                    self._lines_queued = 0
+                    closed = self._closed
+                    self._cond.notify_all()  # wake producers blocked on a full queue
+
+                for kind, payload in items:
+                    if kind == "line":
+                        try:
+                            if self.metrics:
+                                self.metrics.add(*payload)  # before coalescing: every value counts
+                            emit(self.coalescer.add(*payload) if self.coalescer else [payload])
+                        except Exception as e:
+                            failed(e)
+                    elif kind == "clear":
+                        if self.segments.enabled:
+                            # Rotating: pending lines are already counted in the index, so
+                            # they go into the segment being sealed
+                            write_buffer(drain=True)
+                            f.close()
+                            self.segments.seal()
+                        else:
+                            with self._cond:
+                                self.counters["cleared"] += len(buffer)
+                            if self.coalescer:
+                                self.coalescer.reset()
+                            buffer = []
+                            buffered_bytes = 0
+                            f.close()
+                            self.segments.reset_active()
+                        f = open(self.path, "w", encoding="utf-8")
+                        payload.set()
+                    elif kind == "flush":
+                        write_buffer(drain=True)
+                        payload.set()
+
+                if self.coalescer:
+                    emit(self.coalescer.poll())
+                if buffered_bytes >= self.flush_bytes or time.monotonic() - last_flush >= self.flush_interval:
+                    write_buffer()
+                    if self.segments.enabled and self.segments.should_rotate(f.tell()):
+                        f.close()
+                        self.segments.seal()
+                        f = open(self.path, "w", encoding="utf-8")
+                if closed:
+                    write_buffer(drain=True)
+                    return
+        finally:
+            f.close()
+            if self.metrics:
+                self.metrics.close()
+
+
+def accept(writer, msg, ts_ms=None, deadline=None):
+    """Queue one message if it is mission-critical. Returns True if queued."""
+    if FILTER.search(msg) is None:
+        return False
+    return writer.submit(msg, ts_ms, deadline)
+
+
 class LogHandler(BaseHTTPRequestHandler):
     def log_message(self, format, *args):
         pass  # Silence HTTP logs
 
+    @property
+    def writer(self):
+        return self.server.writer
+
     def _cors(self):
         self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Max-Age", "86400")
+
+    def _json(self, code, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self._cors()
+        self.end_headers()
+        self.wfile.write(body)
 
     def do_OPTIONS(self):
         self.send_response(200)
         self._cors()
         self.end_headers()
 
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            self._json(200, self.writer.stats())
+            return
+
+        if url.path == "/log/stream":
+            self._stream({k: v[0] for k, v in parse_qs(url.query).items()})
+            return
+
+        if url.path == "/log":
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                since, until = parse_time(q.get("since")), parse_time(q.get("until"))
+                limit = int(q.get("limit", QUERY_LIMIT))
+            except ValueError as e:
+                self._json(400, {"error": str(e)})
+                return
+            self._json(200, self.writer.segments.query(since, until, q.get("pattern"), limit))
+            return
+
+        if url.path == "/metrics/series":
+            self._json(200, self.writer.metrics.series() if self.writer.metrics else [])
+            return
+
+        if url.path == "/metrics/query":
+            if not self.writer.metrics:
+                self._json(404, {"error": "metric extraction is disabled"})
+                return
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                if "series" not in q:
+                    raise ValueError("series is required")
+                result = self.writer.metrics.query(
+                    q["series"], parse_time(q.get("since")), parse_time(q.get("until")),
+                    float(q["step"]) if q.get("step") else None, q.get("agg", "avg"),
+                    {k[4:]: v for k, v in q.items() if k.startswith("tag.")})
+            except (ValueError, sqlite3.Error) as e:
+                self._json(400, {"error": str(e)})
+                return
+            self._json(200, result)
+            return
+
+        if url.path == "/patterns":
+            self._json(200, FILTER.patterns)
+            return
+
+        self.send_response(404)
+        self.end_headers()
+
+    def _stream(self, q):
+        last_id = self.headers.get("Last-Event-ID") or q.get("last_id")
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            last_id = None
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self._cors()
+        self.end_headers()
+
+        stream = self.writer.stream
+        sub = stream.subscribe(q.get("pattern") or None, last_id)
+        try:
+            self.wfile.write(b"retry: 2000\n\n")
+            self.wfile.flush()
+            while True:
+                events, dropped = sub.take(STREAM_KEEPALIVE)
+                chunks = []
+                if dropped:
+                    chunks.append(f"event: dropped\ndata: {dropped}\n\n")
+                for event_id, kind, data in events:
+                    head = f"id: {event_id}\n" if kind == "line" else f"id: {event_id}\nevent: {kind}\n"
+                    body = "".join(f"data: {part}\n" for part in data.split("\n"))
+                    chunks.append(f"{head}{body}\n")
+                if not chunks:
+                    chunks.append(": keepalive\n\n")
+                self.wfile.write("".join(chunks).encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+        finally:
+            stream.unsubscribe(sub)
+
     def do_POST(self):
         if self.path == "/clear":
-            open(LOGFILE, "w").close()
+            self.writer.clear()
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Log cleared")
             self.send_response(200)
             self._cors()
             self.end_headers()
             return
 
+        if self.path == "/patterns/reload":
+            try:
+                self._json(200, FILTER.reload())
+            except (OSError, ValueError) as e:
+                self._json(400, {"error": str(e)})
+            return
+
+        if self.path == "/patterns":
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                patterns = json.loads(self.rfile.read(length).decode("utf-8"))
+                if not isinstance(patterns, list):
+                    raise ValueError("expected a JSON array of patterns")
+                FILTER.set([str(p) for p in patterns])
+            except ValueError as e:
+                self._json(400, {"error": str(e)})
+                return
+            self._json(200, FILTER.patterns)
+            return
+
         if self.path == "/log":
             length = int(self.headers.get("Content-Length", 0))
-            body = self.rfile.read(length).decode("utf-8")
-            data = json.loads(body)
-            msg = data.get("msg", "")
+            try:
+                msg = str(json.loads(self.rfile.read(length).decode("utf-8")).get("msg", ""))
+            except (ValueError, AttributeError) as e:
+                # Malformed body: answer like /log/batch instead of dropping the connection
+                self.send_response(400)
+                self._cors()
+                self.end_headers()
+                self.wfile.write(str(e).encode())
+                return
 
             # Filter: only mission-critical
-            if any(p in msg for p in CRITICAL_PATTERNS):
-                ts = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                line = f"[{ts}] {msg}"
-                print(line)
-                with open(LOGFILE, "a") as f:
-                    f.write(line + "\n")
-
-            self.send_response(200)
+            if FILTER.search(msg) is not None and not self.writer.submit(msg):
+                self.send_response(503)  # queue full under "block" policy
+            else:
+                self.send_response(200)
             self._cors()
             self.end_headers()
             return
 
+        if self.path == "/log/batch":
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                entries = parse_batch(self.rfile.read(length).decode("utf-8"))
+            except (ValueError, AttributeError) as e:
+                self.send_response(400)
+                self._cors()
+                self.end_headers()
+                self.wfile.write(str(e).encode())
+                return
+
+            # Filter per entry; lines are written with their client timestamps.
+            # Under "block" the whole batch waits at most BLOCK_TIMEOUT.
+            deadline = time.monotonic() + BLOCK_TIMEOUT
+            matched = [(msg, ts) for msg, ts in entries if FILTER.search(msg) is not None]
+            written = sum(self.writer.submit(msg, ts, deadline) for msg, ts in matched)
+            rejected = len(matched) - written
+            # 503 like /log when the queue turned lines away; the body says how many
+            self._json(503 if rejected else 200,
+                       {"received": len(entries), "written": written, "rejected": rejected})
+            return
+
         self.send_response(404)
         self.end_headers()
 
+
+def add_writer_args(parser):
+    """Writer tuning flags shared with serve_coi.py."""
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help="Max lines waiting for the writer thread")
+    parser.add_argument("--on-full", choices=FULL_POLICIES, default="drop-oldest",
+                        help="Policy when the queue is full")
+    parser.add_argument("--flush-bytes", type=int, default=FLUSH_BYTES,
+                        help="Flush when this many bytes are buffered")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL,
+                        help="Flush at least this often (seconds)")
+    parser.add_argument("--quiet", action="store_true", help="Do not echo lines to stdout")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="Fold runs of same-template measurement lines into one record")
+    parser.add_argument("--coalesce-pattern", action="append", dest="coalesce_patterns",
+                        help=f"Only fold lines containing this (repeatable; default {COALESCE_PATTERNS})")
+    parser.add_argument("--patterns-file",
+                        help="Read filter patterns from this file (one per line); reload via POST /patterns/reload")
+    parser.add_argument("--rotate-bytes", type=int, default=0,
+                        help="Seal the active log into a gzip segment at this size (0 = off)")
+    parser.add_argument("--rotate-seconds", type=float, default=0,
+                        help="Seal the active log after this many seconds (0 = off)")
+    parser.add_argument("--segment-dir", help="Where sealed segments and index.json live "
+                                              "(default: <logfile stem>_segments next to the log)")
+    parser.add_argument("--keep-segments", type=int, default=0,
+                        help="Delete the oldest segments beyond this count (0 = keep all)")
+    parser.add_argument("--metrics-db",
+                        help="SQLite file for extracted metric samples (default: <logfile stem>_metrics.sqlite)")
+    parser.add_argument("--metric-templates",
+                        help="JSON file with a list of metric templates (replaces METRIC_TEMPLATES)")
+    parser.add_argument("--no-metrics", action="store_true", help="Disable metric extraction")
+
+
+def make_writer(args, path):
+    if args.patterns_file:
+        FILTER.path = args.patterns_file
+        FILTER.reload()
+    segments = SegmentStore(path, args.segment_dir, args.rotate_bytes, args.rotate_seconds,
+                            args.keep_segments)
+    metrics = None
+    if not args.no_metrics:
+        templates = METRIC_TEMPLATES
+        if args.metric_templates:
+            with open(args.metric_templates, encoding="utf-8") as f:
+                templates = json.load(f)
+        db = args.metrics_db or Path(path).with_name(Path(path).stem + "_metrics.sqlite")
+        metrics = MetricStore(db, MetricExtractor(templates))
+    return LogWriter(path, queue_size=args.queue_size, on_full=args.on_full,
+                     flush_bytes=args.flush_bytes, flush_interval=args.flush_interval,
+                     echo=not args.quiet, coalesce=args.coalesce, segments=segments,
+                     metrics=metrics, coalesce_patterns=args.coalesce_patterns or COALESCE_PATTERNS)
+
+
 if __name__ == "__main__":
-    print(f"Mission-critical logger on :9999 -> {LOGFILE}")
-    print(f"Patterns: {CRITICAL_PATTERNS}")
-    HTTPServer(("", 9999), LogHandler).serve_forever()
+    parser = argparse.ArgumentParser(description="Mission-critical logging server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--logfile", default=LOGFILE)
+    add_writer_args(parser)
+    args = parser.parse_args()
+    LOGFILE = args.logfile
+
+    print(f"Mission-critical logger on :{args.port} -> {LOGFILE}")
+    server = ThreadingHTTPServer(("", args.port), LogHandler)
+    server.daemon_threads = True
+    server.writer = make_writer(args, LOGFILE)
+    print(f"Patterns: {FILTER.patterns}")
+    print(f"Queue: {args.queue_size} lines, on full: {args.on_full}, coalesce: {args.coalesce}")
+    if server.writer.metrics:
+        print(f"Metrics: {server.writer.metrics.path} ({len(server.writer.metrics.extractor.templates)} templates)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.writer.close()
+        print(f"\nStats: {json.dumps(server.writer.stats())}")
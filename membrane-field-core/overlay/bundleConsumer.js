@@ -20,6 +20,7 @@ import {
 } from '../contracts/ReynosaOverlayBundle.js';
 
 import { getMicroParkingLots } from './microGeometry.js';
+import { getSegmentCells } from './segmentMetrics.js';
 import { DEFAULT_POE_NAMES } from '../engine/geometryProvider.js';
 
 // =============================================================================
@@ -325,10 +326,15 @@ export function createFieldGeometryProvider(microStamps = null) {
             originY: roiCenterY - ROI_SIZE_M / 2,
         }),
 
+        // cells/cellsRoi: precomputed K-tensor footprint from the segment metrics sidecar
         getRoadSegments: () => {
             const segments = getSegmentsInROI();
+            const metrics = currentBundle?.geometry?.segmentMetrics;
             return segments.map(seg => ({
+                segment_id: seg.segment_id,
                 points: seg.points,
+                cells: getSegmentCells(metrics, seg.segment_id),
+                cellsRoi: metrics?.roi || null,
             }));
         },
 
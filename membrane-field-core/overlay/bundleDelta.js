@@ -0,0 +1,65 @@
+// ═══════════════════════════════════════════════════════════════════════════════
+// BUNDLE DELTA
+// Rebuilds a scenario bundle from a loaded base bundle + a delta written by
+// test/bundle_delta.py (format documented there).
+//
+// The base is never mutated: changed paths are copied, unchanged subtrees are
+// shared with the base (treat the result as read-only, like any bundle).
+// ═══════════════════════════════════════════════════════════════════════════════
+
+const DELTA_VERSION = 1;
+
+/**
+ * Apply one delta node to a value.
+ * @param {*} base
+ * @param {object|undefined} node
+ * @returns {*}
+ */
+function applyNode(base, node) {
+    if (!node) return base;
+    if ('=' in node) return node['='];
+
+    if ('#' in node) {
+        const out = base.slice();
+        for (const k in node['+'] || {}) out[+k] = node['+'][k];
+        for (const k in node['~'] || {}) out[+k] = out[+k] + node['~'][k];
+        for (const k in node['>'] || {}) out[+k] = applyNode(out[+k], node['>'][k]);
+        return out;
+    }
+
+    const out = { ...base };
+    for (const k of node['-'] || []) delete out[k];
+    for (const k in node['~'] || {}) out[k] = out[k] + node['~'][k];
+    for (const k in node['>'] || {}) out[k] = applyNode(out[k], node['>'][k]);
+    for (const k in node['+'] || {}) out[k] = node['+'][k];
+    if (node.order) {
+        const ordered = {};
+        for (const k of node.order) ordered[k] = out[k];
+        return ordered;
+    }
+    return out;
+}
+
+/**
+ * Rebuild a bundle from its base and a delta document.
+ * @param {object} base - Parsed base bundle (e.g. bundle_baseline.json)
+ * @param {{_delta: {version: number, base: string, target: string}, ops: object}} delta
+ * @returns {object} Scenario bundle
+ * @throws {Error} on an unknown delta version
+ */
+export function applyBundleDelta(base, delta) {
+    const header = delta?._delta;
+    if (!header || header.version !== DELTA_VERSION) {
+        throw new Error(`[BundleDelta] Unsupported delta version: ${header?.version}`);
+    }
+    return applyNode(base, delta.ops);
+}
+
+/**
+ * True if a parsed JSON document is a bundle delta rather than a full bundle.
+ * @param {object} doc
+ * @returns {boolean}
+ */
+export function isBundleDelta(doc) {
+    return !!doc?._delta;
+}
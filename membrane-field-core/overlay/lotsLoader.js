@@ -186,6 +186,28 @@ function rasterizePoint(fieldPoint, N) {
     return [];
 }
 
+/**
+ * Resolve a lots file through the manifest.json in its directory
+ * (scripts/asset_manifest.py), so a published content-hashed copy is fetched
+ * and cached as immutable. Unlisted files, a missing manifest and headless
+ * runs (file reads) use the path as given.
+ * @param {string} lotsJsonPath
+ * @returns {Promise<string>}
+ */
+async function resolveLotsUrl(lotsJsonPath) {
+    if (nodeFetch) return lotsJsonPath;
+    try {
+        const url = new URL(lotsJsonPath, globalThis.location?.href);
+        const dir = new URL('./', url);
+        const response = await fetch(new URL('manifest.json', dir), { cache: 'no-cache' });
+        if (!response.ok) return lotsJsonPath;
+        const hashed = (await response.json()).assets?.[url.pathname.slice(dir.pathname.length)];
+        return hashed ? new URL(hashed, dir).href : lotsJsonPath;
+    } catch (err) {
+        return lotsJsonPath;
+    }
+}
+
 // ───────────────────────────────────────────────────────────────────────────────
 // MAIN LOADER
 // ───────────────────────────────────────────────────────────────────────────────
@@ -194,7 +216,7 @@ function rasterizePoint(fieldPoint, N) {
  * Load lots from JSON and rasterize to field cells.
  * Supports v2.0 schema with layers and geometry types.
  *
- * @param {string} lotsJsonPath - path to lots.json (relative to page)
+ * @param {string} lotsJsonPath - path to lots.json (relative to page; resolved through manifest.json)
  * @param {{ centerX: number, centerY: number, sizeM: number }} roi
  * @param {number} N - field resolution
  * @returns {Promise<{
@@ -212,7 +234,7 @@ function rasterizePoint(fieldPoint, N) {
  */
 export async function loadLots(lotsJsonPath, roi, N) {
     const fetchFn = nodeFetch || fetch;
-    const response = await fetchFn(lotsJsonPath);
+    const response = await fetchFn(await resolveLotsUrl(lotsJsonPath));
     if (!response.ok) {
         throw new Error(`Failed to load lots.json: ${response.status}`);
     }
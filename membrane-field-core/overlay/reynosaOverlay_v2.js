@@ -37,6 +37,7 @@ import {
 } from './scenarioPair.js';
 
 import { loadLots, stampLots, buildLotCellIndices, getIndustrialParksWithArea } from './lotsLoader.js';
+import { segmentMetricsMatchRoi, forEachRunCell, getSegmentBbox } from './segmentMetrics.js';
 
 import {
     computeInjectionPointWeightsFromWorldSegments,
@@ -5549,8 +5550,20 @@ function bakeKTensor(geometry) {
     Kyy.fill(0);
 
     let cellsStamped = 0;
+    let segmentsPrecomputed = 0;
 
     for (const seg of geometry.roadSegments) {
+        // Cells precomputed by test/segment_metrics.py for this grid: stamp directly
+        if (seg.cells && segmentMetricsMatchRoi(seg.cellsRoi, roi, N)) {
+            forEachRunCell(seg.cells, idx => {
+                if (Kxx[idx] < 1) cellsStamped++;
+                Kxx[idx] = 1;
+                Kyy[idx] = 1;
+            });
+            segmentsPrecomputed++;
+            continue;
+        }
+
         // Check if segment is in ROI
         const inROI = seg.points?.some(p =>
             Math.abs(p.x - roi.centerX) < roi.sizeM &&
@@ -5589,7 +5602,7 @@ function bakeKTensor(geometry) {
         }
     }
 
-    log(`[BAKE] Stamped ${cellsStamped} road cells`);
+    log(`[BAKE] Stamped ${cellsStamped} road cells (${segmentsPrecomputed} segments from sidecar)`);
 }
 
 // ═══════════════════════════════════════════════════════════════════════════════
@@ -8329,10 +8342,20 @@ function computeInjectionWeightsFromBundle(bundle, label = '') {
     if (!rawSegments || rawSegments.length === 0) {
         throw new Error('[INJECTION] No segments in ROI - check bundle geometry');
     }
-    const worldSegments = rawSegments.map(seg => ({
-        segment_id: seg.segment_id,
-        points: seg.geometry_coordinates.map(([lat, lon]) => latLonToWorld(lat, lon)),
-    }));
+    // Only segments carrying PHARR load are matched, so only those are projected;
+    // sidecar bboxes (geometry.segmentMetrics) let the matcher skip distant entry points
+    const loadedIds = new Set();
+    for (const bySeg of Object.values(bundle.segment_load_kg_by_poe_hs2.hidalgo_pharr || {})) {
+        for (const segId in bySeg) loadedIds.add(segId);
+    }
+    const metrics = bundle.geometry.segmentMetrics;
+    const worldSegments = rawSegments
+        .filter(seg => loadedIds.has(seg.segment_id))
+        .map(seg => ({
+            segment_id: seg.segment_id,
+            points: seg.geometry_coordinates.map(([lat, lon]) => latLonToWorld(lat, lon)),
+            bbox: getSegmentBbox(metrics, seg.segment_id),
+        }));
 
     // Build injection points array
     const injectionPoints = CORRIDOR_ENTRY_COORDS.map(c => ({
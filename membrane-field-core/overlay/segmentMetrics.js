@@ -0,0 +1,88 @@
+// ═══════════════════════════════════════════════════════════════════════════════
+// SEGMENT METRICS
+// Reads the <bundle>.segmetrics.json sidecars written by test/segment_metrics.py
+// (format documented there): per-segment world bbox and the road cells
+// bakeKTensor would stamp, so bundle load can skip the per-point bbox loops
+// and the K-tensor resampling.
+//
+// A sidecar is only valid for the transform and ROI it was built with; the
+// match helpers below decide whether to use it or fall back to the geometry.
+// ═══════════════════════════════════════════════════════════════════════════════
+
+export const SEGMENT_METRICS_VERSION = 2;
+
+// Sidecars store world meters at 0.1 m; transforms/ROI centers are compared loosely
+const FRAME_EPSILON = 1e-6;
+
+/**
+ * True if a parsed JSON document is a segment metrics sidecar this reader understands.
+ * @param {object} doc
+ * @returns {boolean}
+ */
+export function isSegmentMetrics(doc) {
+    return doc?.version === SEGMENT_METRICS_VERSION && !!doc.segments && !!doc.roi;
+}
+
+/**
+ * True if the sidecar was projected with this transform.
+ * @param {object} doc - Segment metrics sidecar
+ * @param {{origin_lat: number, origin_lon: number, meters_per_deg_lat: number, meters_per_deg_lon: number}} transform
+ * @returns {boolean}
+ */
+export function segmentMetricsMatchTransform(doc, transform) {
+    if (!isSegmentMetrics(doc) || !transform) return false;
+    const t = doc.transform;
+    return ['origin_lat', 'origin_lon', 'meters_per_deg_lat', 'meters_per_deg_lon']
+        .every(k => Math.abs(t[k] - transform[k]) <= FRAME_EPSILON * Math.max(1, Math.abs(transform[k])));
+}
+
+/**
+ * True if cells stored for `metricsRoi` index the same grid as the field's ROI.
+ * @param {{centerX: number, centerY: number, sizeM: number, N: number}|null} metricsRoi - doc.roi
+ * @param {{centerX: number, centerY: number, sizeM: number}} roi - Field ROI
+ * @param {number} N - Field cells per side
+ * @returns {boolean}
+ */
+export function segmentMetricsMatchRoi(metricsRoi, roi, N) {
+    if (!metricsRoi) return false;
+    return metricsRoi.N === N &&
+        metricsRoi.sizeM === roi.sizeM &&
+        Math.abs(metricsRoi.centerX - roi.centerX) <= FRAME_EPSILON &&
+        Math.abs(metricsRoi.centerY - roi.centerY) <= FRAME_EPSILON;
+}
+
+/**
+ * World bbox of one segment, or null if the sidecar has no entry for it.
+ * @param {object} doc - Segment metrics sidecar
+ * @param {string} segmentId
+ * @returns {{minX: number, minY: number, maxX: number, maxY: number}|null}
+ */
+export function getSegmentBbox(doc, segmentId) {
+    const bbox = doc?.segments[segmentId]?.bbox;
+    if (!bbox) return null;
+    return { minX: bbox[0], minY: bbox[1], maxX: bbox[2], maxY: bbox[3] };
+}
+
+/**
+ * Run-length encoded road cells of one segment ([gap, count, ...]), or null.
+ * @param {object} doc - Segment metrics sidecar
+ * @param {string} segmentId
+ * @returns {number[]|null}
+ */
+export function getSegmentCells(doc, segmentId) {
+    return doc?.segments[segmentId]?.cells || null;
+}
+
+/**
+ * Call fn(cellIndex) for every cell of a run list from getSegmentCells.
+ * @param {number[]} runs - [gap, count, gap, count, ...], gaps from the end of the previous run
+ * @param {function(number): void} fn
+ */
+export function forEachRunCell(runs, fn) {
+    let end = 0;
+    for (let i = 0; i < runs.length; i += 2) {
+        const start = end + runs[i];
+        end = start + runs[i + 1];
+        for (let idx = start; idx < end; idx++) fn(idx);
+    }
+}
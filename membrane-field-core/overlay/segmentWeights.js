@@ -503,7 +503,7 @@ export function computeInjectionPointWeights(
  * This uses the same world coords as MACRO view rendering.
  *
  * @param {object} bundle - ReynosaOverlayBundle with segment_load_kg_by_poe_hs2
- * @param {Array<{segment_id: string, points: Array<{x: number, y: number}>}>} worldSegments - Segments with world coords (from getSegmentsInROI)
+ * @param {Array<{segment_id: string, points: Array<{x: number, y: number}>, bbox?: {minX: number, minY: number, maxX: number, maxY: number}|null}>} worldSegments - Segments with world coords (from getSegmentsInROI); optional bbox (segmentMetrics.getSegmentBbox) skips distant injection points
  * @param {Array<{x: number, y: number, id: string}>} injectionPoints - Injection point coords
  * @param {number} [matchThreshold=500] - Distance threshold in meters
  * @param {string} [poeFilter='hidalgo_pharr'] - POE to filter segment weights
@@ -548,9 +548,11 @@ export function computeInjectionPointWeightsFromWorldSegments(
 
     // Build segment geometry lookup from pre-transformed world coords
     const segmentGeom = new Map();
+    const segmentBbox = new Map();
     for (const seg of worldSegments) {
         if (seg.points && seg.points.length > 0) {
             segmentGeom.set(seg.segment_id, seg.points);
+            if (seg.bbox) segmentBbox.set(seg.segment_id, seg.bbox);
         }
     }
 
@@ -570,8 +572,15 @@ export function computeInjectionPointWeightsFromWorldSegments(
         // Find which injection point this segment passes through
         let bestMatch = null;
         let bestDist = Infinity;
+        const bbox = segmentBbox.get(segId);
 
         for (const pt of injectionPoints) {
+            // No vertex is closer than the segment's bbox: skip points that cannot win
+            if (bbox) {
+                const bx = Math.max(bbox.minX - pt.x, 0, pt.x - bbox.maxX);
+                const by = Math.max(bbox.minY - pt.y, 0, pt.y - bbox.maxY);
+                if (Math.sqrt(bx * bx + by * by) >= bestDist) continue;
+            }
             for (const wp of points) {
                 const dx = wp.x - pt.x;
                 const dy = wp.y - pt.y;
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Content-hashed asset manifest for the data files loaded by testBundle.html.
+
+Each published file is copied to <stem>.<hash>.<ext> next to the original and
+recorded in manifest.json in the same directory:
+
+    {"version": 1, "generated": "...",
+     "assets": {"bundle_baseline.json": "bundle_baseline.3f2a9c1d4e5b.json"}}
+
+serve_coi.py serves manifest.json with no-cache and the hashed files as
+immutable, so repeat loads resolve from the browser cache.
+
+Usage:
+    python scripts/asset_manifest.py test/geometry.json test/bundle_baseline.json
+    python scripts/asset_manifest.py --list test/manifest.json
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+
+# <stem>.<12 hex>.<ext> — must stay in sync with serve_coi.HASHED_ASSET_RE
+HASHED_NAME_RE = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$' % HASH_LENGTH)
+
+
+def content_hash(path):
+    """SHA-256 of file contents, truncated to HASH_LENGTH hex chars."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(logical, digest):
+    """bundle_baseline.json -> bundle_baseline.<digest>.json (keeps subdirectories)."""
+    logical = PurePosixPath(logical)
+    return logical.with_name(f"{logical.stem}.{digest}{logical.suffix}").as_posix()
+
+
+def load_manifest(manifest_path):
+    manifest_path = Path(manifest_path)
+    if not manifest_path.exists():
+        return {'version': 1, 'generated': None, 'assets': {}}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(manifest_path, manifest):
+    manifest['generated'] = datetime.now().isoformat(timespec='seconds')
+    tmp = Path(manifest_path).with_suffix('.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp.replace(manifest_path)
+
+
+def publish(path, manifest_path=None):
+    """
+    Copy `path` to its content-hashed name and register it in the manifest.
+
+    The manifest defaults to manifest.json in the same directory; logical
+    names are file names relative to that directory. The previous hashed copy
+    of the same asset is removed when its content changes.
+    Returns the hashed file name.
+    """
+    path = Path(path)
+    manifest_path = Path(manifest_path) if manifest_path else path.parent / MANIFEST_NAME
+    base_dir = manifest_path.parent
+
+    logical = path.resolve().relative_to(base_dir.resolve()).as_posix()
+    digest = content_hash(path)
+    target_name = hashed_name(logical, digest)
+    target = base_dir / target_name
+
+    if not target.exists():
+        shutil.copyfile(path, target)
+
+    manifest = load_manifest(manifest_path)
+    previous = manifest['assets'].get(logical)
+    if previous and previous != target_name:
+        old = base_dir / previous
+        if old.exists() and HASHED_NAME_RE.match(old.name):
+            old.unlink()
+
+    manifest['assets'][logical] = target_name
+    write_manifest(manifest_path, manifest)
+    print(f"[MANIFEST] {logical} -> {target_name}")
+    return target_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish content-hashed assets into manifest.json')
+    parser.add_argument('files', nargs='*', help='Files to publish')
+    parser.add_argument('--manifest', '-m', default=None,
+                        help='Manifest path (default: manifest.json next to each file)')
+    parser.add_argument('--list', metavar='MANIFEST', help='Print a manifest and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for logical, name in sorted(load_manifest(args.list)['assets'].items()):
+            print(f"  {logical:40} {name}")
+        return
+
+    for f in args.files:
+        publish(f, args.manifest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Load-generation benchmark for the local dev servers (stdlib only).
+
+Starts a server on a free port, replays a realistic request mix from N
+concurrent clients for a fixed duration, samples the server's CPU/RSS, and
+writes a result JSON that can be compared against a previous run.
+
+Targets:
+  coi      serve_coi.py       page-load sequences (testBundle.html + modules
+                              + data files) and large bundle downloads
+  log      log_server.py      bursty /log POSTs replayed from test/debug.log
+                              (or /log/batch requests with --mix log_batch=1)
+  testlog  test/log_server.py same bursts against the debug log server
+
+Usage:
+    python scripts/bench_servers.py coi --clients 8 --duration 20
+    python scripts/bench_servers.py log testlog --clients 16
+    python scripts/bench_servers.py log --mix log_batch=1       # batched ingestion
+    python scripts/bench_servers.py log --url http://localhost:9999   # already running
+    python scripts/bench_servers.py --compare results/bench/A.json results/bench/B.json
+
+Results: results/bench/<stamp>_<target>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+TEST_DIR = ROOT / 'test'
+RESULTS_DIR = ROOT / 'results' / 'bench'
+
+# Data files testBundle.html fetches after its modules (those that exist are used)
+PAGE_DATA_FILES = [
+    'test/manifest.json',
+    'test/geometry.json',
+    'test/bundle_baseline.json',
+    'test/bundle_baseline_LAYER_A.json',
+    'test/interserrana_bundle.json',
+    'test/reynosa_city_bundle.json',
+    'data/mexican_origins.json',
+]
+
+# Files above this size count as "large bundle downloads"
+LARGE_FILE_BYTES = 1_000_000
+
+# Scenario weights per target
+MIXES = {
+    'coi': {'page_load': 0.3, 'large_download': 0.7},
+    'log': {'log_burst': 1.0},
+    'testlog': {'log_burst': 1.0},
+}
+
+LOG_BURST_SIZE = (5, 40)       # POSTs per burst (uniform range)
+LOG_BURST_GAP_S = (0.05, 0.5)  # idle time between bursts
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SERVER PROCESS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(target, tmpdir):
+    """Launch the target server on a free port. Returns (process, port)."""
+    port = free_port()
+    if target == 'coi':
+        # Serves the repo's static files; log routes (and metrics DB) write to tmpdir
+        cmd = [sys.executable, str(ROOT / 'serve_coi.py'), str(port),
+               '--logfile', str(Path(tmpdir) / 'mission_critical.log')]
+        cwd = ROOT
+    elif target == 'log':
+        cmd = [sys.executable, str(ROOT / 'log_server.py'), '--port', str(port),
+               '--logfile', str(Path(tmpdir) / 'mission_critical.log')]
+        cwd = tmpdir
+    elif target == 'testlog':
+        cmd = [sys.executable, str(TEST_DIR / 'log_server.py'), '--port', str(port),
+               '--logfile', str(Path(tmpdir) / 'debug.log')]
+        cwd = tmpdir
+    else:
+        raise ValueError(f"Unknown target: {target}")
+
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return proc, port
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{target} server exited with code {proc.returncode}")
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError(f"{target} server did not start on :{port}")
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a pid (psutil if available, else /proc)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.samples = []
+        try:
+            import psutil
+            self._proc = psutil.Process(pid)
+        except ImportError:
+            self._proc = None
+        self._clk = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self._page = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def read(self):
+        """Return (cpu_seconds, rss_bytes) or None if unavailable."""
+        try:
+            if self._proc is not None:
+                t = self._proc.cpu_times()
+                return t.user + t.system, self._proc.memory_info().rss
+            with open(f'/proc/{self.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{self.pid}/statm') as f:
+                rss_pages = int(f.read().split()[1])
+            return (int(fields[11]) + int(fields[12])) / self._clk, rss_pages * self._page
+        except Exception:
+            return None
+
+    async def run(self, stop, interval=0.5):
+        while not stop.is_set():
+            sample = self.read()
+            if sample:
+                self.samples.append((time.perf_counter(),) + sample)
+            await asyncio.sleep(interval)
+
+    def summary(self):
+        if len(self.samples) < 2:
+            return {'cpu_percent': None, 'rss_mb_peak': None, 'rss_mb_end': None}
+        (t0, c0, _), (t1, c1, r1) = self.samples[0], self.samples[-1]
+        return {
+            'cpu_percent': round(100 * (c1 - c0) / (t1 - t0), 1),
+            'rss_mb_peak': round(max(s[2] for s in self.samples) / 1e6, 1),
+            'rss_mb_end': round(r1 / 1e6, 1),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# HTTP CLIENT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+async def http_request(host, port, method, path, body=b'', headers=None):
+    """Minimal HTTP/1.1 request with Connection: close. Returns (status, bytes, ttfb_s, total_s)."""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close"]
+        for k, v in (headers or {}).items():
+            lines.append(f"{k}: {v}")
+        if body:
+            lines.append(f"Content-Length: {len(body)}")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        ttfb = time.perf_counter() - start
+        status = int(status_line.split()[1]) if status_line else 0
+        nbytes = len(status_line)
+        while True:
+            chunk = await reader.read(1 << 16)
+            if not chunk:
+                break
+            nbytes += len(chunk)
+        return status, nbytes, ttfb, time.perf_counter() - start
+    finally:
+        writer.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SCENARIOS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def page_load_paths():
+    """testBundle.html, the modules it imports, then the data files it fetches."""
+    html = TEST_DIR / 'testBundle.html'
+    paths = ['/test/testBundle.html']
+    for module in re.findall(r"from '(\.\./[^']+\.js)'", html.read_text(encoding='utf-8')):
+        paths.append('/' + module[3:])
+    paths.extend('/' + p for p in PAGE_DATA_FILES if (ROOT / p).exists())
+    return list(dict.fromkeys(paths))
+
+
+def large_file_paths():
+    files = [p for p in PAGE_DATA_FILES if (ROOT / p).exists() and (ROOT / p).stat().st_size >= LARGE_FILE_BYTES]
+    if not files:
+        # Scenario bundles are not in git; fall back to the largest tracked JSON
+        files = [str(p.relative_to(ROOT).as_posix()) for p in sorted(TEST_DIR.glob('*.json'),
+                 key=lambda p: p.stat().st_size, reverse=True)[:2]]
+    return ['/' + f for f in files]
+
+
+def log_messages():
+    lines = (TEST_DIR / 'debug.log').read_text(encoding='utf-8').splitlines()
+    msgs = [re.sub(r'^\[[^\]]+\]\s*', '', l) for l in lines if l.startswith('[')]
+    return msgs or ['[Director] Layer B alpha: 0.000']
+
+
+class Recorder:
+    def __init__(self):
+        self.by_scenario = {}
+        self.errors = 0
+        self.requests = 0
+        self.bytes = 0
+
+    def add(self, scenario, status, nbytes, ttfb, total):
+        self.requests += 1
+        self.bytes += nbytes
+        if status == 0 or status >= 400:
+            self.errors += 1
+        self.by_scenario.setdefault(scenario, []).append(total)
+
+    def error(self, scenario):
+        self.requests += 1
+        self.errors += 1
+        self.by_scenario.setdefault(scenario, [])
+
+
+async def run_page_load(host, port, rec, ctx):
+    # Browsers fetch modules and data files in parallel after the HTML arrives
+    paths = ctx['page_paths']
+    await one(host, port, rec, 'page_load', 'GET', paths[0])
+    await asyncio.gather(*(one(host, port, rec, 'page_load', 'GET', p) for p in paths[1:]))
+
+
+async def run_large_download(host, port, rec, ctx):
+    await one(host, port, rec, 'large_download', 'GET', random.choice(ctx['large_paths']))
+
+
+async def run_log_burst(host, port, rec, ctx):
+    n = random.randint(*LOG_BURST_SIZE)
+    start = random.randrange(len(ctx['log_msgs']))
+    for i in range(n):
+        msg = ctx['log_msgs'][(start + i) % len(ctx['log_msgs'])]
+        body = json.dumps({'msg': msg}).encode('utf-8')
+        await one(host, port, rec, 'log_burst', 'POST', '/log', body, {'Content-Type': 'application/json'})
+    await asyncio.sleep(random.uniform(*LOG_BURST_GAP_S))
+
+
+async def run_log_batch(host, port, rec, ctx):
+    # Same burst as run_log_burst, sent as one /log/batch request
+    n = random.randint(*LOG_BURST_SIZE)
+    start = random.randrange(len(ctx['log_msgs']))
+    now_ms = time.time() * 1000
+    batch = [{'msg': ctx['log_msgs'][(start + i) % len(ctx['log_msgs'])], 'ts': now_ms} for i in range(n)]
+    await one(host, port, rec, 'log_batch', 'POST', '/log/batch', json.dumps(batch).encode('utf-8'),
+              {'Content-Type': 'text/plain'})
+    await asyncio.sleep(random.uniform(*LOG_BURST_GAP_S))
+
+
+SCENARIOS = {
+    'page_load': run_page_load,
+    'large_download': run_large_download,
+    'log_burst': run_log_burst,
+    'log_batch': run_log_batch,
+}
+
+
+async def one(host, port, rec, scenario, method, path, body=b'', headers=None):
+    try:
+        rec.add(scenario, *await http_request(host, port, method, path, body, headers))
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+        rec.error(scenario)
+
+
+async def client_loop(host, port, mix, rec, ctx, deadline):
+    names, weights = zip(*mix.items())
+    while time.perf_counter() < deadline:
+        await SCENARIOS[random.choices(names, weights)[0]](host, port, rec, ctx)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RUN / REPORT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return round(sorted_values[idx] * 1000, 2)
+
+
+async def bench(target, host, port, pid, clients, duration, mix):
+    ctx = {}
+    if target == 'coi':
+        ctx['page_paths'] = page_load_paths()
+        ctx['large_paths'] = large_file_paths()
+    else:
+        ctx['log_msgs'] = log_messages()
+
+    rec = Recorder()
+    stop = asyncio.Event()
+    sampler = ProcessSampler(pid) if pid else None
+    sampler_task = asyncio.create_task(sampler.run(stop)) if sampler else None
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client_loop(host, port, mix, rec, ctx, deadline) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    if sampler_task:
+        await sampler_task
+
+    all_latencies = sorted(v for vals in rec.by_scenario.values() for v in vals)
+    return {
+        'target': target,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'clients': clients,
+        'mix': mix,
+        'duration_s': round(elapsed, 2),
+        'requests': rec.requests,
+        'req_per_s': round(rec.requests / elapsed, 1),
+        'mb_per_s': round(rec.bytes / elapsed / 1e6, 2),
+        'error_rate': round(rec.errors / rec.requests, 4) if rec.requests else None,
+        'latency_ms': {'p50': percentile(all_latencies, 0.50), 'p99': percentile(all_latencies, 0.99)},
+        'scenarios': {
+            name: {
+                'requests': len(vals),
+                'p50_ms': percentile(sorted(vals), 0.50),
+                'p99_ms': percentile(sorted(vals), 0.99),
+            }
+            for name, vals in sorted(rec.by_scenario.items())
+        },
+        'server': sampler.summary() if sampler else None,
+    }
+
+
+def print_result(r):
+    server = r['server'] or {}
+    print(f"[BENCH] {r['target']}: {r['req_per_s']} req/s, {r['mb_per_s']} MB/s, "
+          f"p50={r['latency_ms']['p50']}ms p99={r['latency_ms']['p99']}ms, "
+          f"errors={100 * (r['error_rate'] or 0):.2f}%, "
+          f"cpu={server.get('cpu_percent')}% rss={server.get('rss_mb_peak')}MB")
+    for name, s in r['scenarios'].items():
+        print(f"  {name:16} n={s['requests']:6} p50={s['p50_ms']}ms p99={s['p99_ms']}ms")
+
+
+def compare(path_a, path_b):
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+
+    def row(label, va, vb):
+        if va is None or vb is None:
+            print(f"  {label:14} {va!s:>10} {vb!s:>10}")
+            return
+        delta = f"{100 * (vb - va) / va:+.1f}%" if va else ''
+        print(f"  {label:14} {va:>10} {vb:>10} {delta:>8}")
+
+    print(f"[BENCH] {a['target']} {a['timestamp']}  vs  {b['target']} {b['timestamp']}")
+    row('req/s', a['req_per_s'], b['req_per_s'])
+    row('MB/s', a['mb_per_s'], b['mb_per_s'])
+    row('p50 ms', a['latency_ms']['p50'], b['latency_ms']['p50'])
+    row('p99 ms', a['latency_ms']['p99'], b['latency_ms']['p99'])
+    row('error rate', a['error_rate'], b['error_rate'])
+    row('cpu %', (a['server'] or {}).get('cpu_percent'), (b['server'] or {}).get('cpu_percent'))
+    row('rss MB peak', (a['server'] or {}).get('rss_mb_peak'), (b['server'] or {}).get('rss_mb_peak'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark serve_coi.py and the log servers')
+    parser.add_argument('targets', nargs='*', help=f"Servers to benchmark: {', '.join(sorted(MIXES))}")
+    parser.add_argument('--clients', '-c', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', '-d', type=float, default=15, help='Seconds per target')
+    parser.add_argument('--mix', help='Override scenario weights, e.g. log_batch=1 or log_burst=1,log_batch=1')
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting one')
+    parser.add_argument('--output-dir', default=str(RESULTS_DIR), help='Where to write result JSON')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not args.targets:
+        parser.error('at least one target is required')
+    for target in args.targets:
+        if target not in MIXES:
+            parser.error(f"unknown target {target!r} (choose from {', '.join(sorted(MIXES))})")
+    if args.url and len(args.targets) != 1:
+        parser.error('--url takes exactly one target')
+    mix_override = None
+    if args.mix:
+        mix_override = {}
+        for part in args.mix.split(','):
+            name, _, weight = part.partition('=')
+            if name not in SCENARIOS:
+                parser.error(f"unknown scenario {name!r} (choose from {', '.join(sorted(SCENARIOS))})")
+            mix_override[name] = float(weight or 1)
+
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime('%y%m%d_%H%M%S')
+
+    for target in args.targets:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            proc = None
+            if args.url:
+                url = urlsplit(args.url)
+                host, port, pid = url.hostname, url.port, None
+            else:
+                proc, port = start_server(target, tmpdir)
+                host, pid = '127.0.0.1', proc.pid
+            print(f"[BENCH] {target} on {host}:{port}, {args.clients} clients, {args.duration}s")
+            try:
+                result = asyncio.run(bench(target, host, port, pid, args.clients, args.duration,
+                                         mix_override or MIXES[target]))
+            finally:
+                if proc:
+                    proc.terminate()
+                    proc.wait(timeout=5)
+
+        print_result(result)
+        out_path = out_dir / f"{stamp}_{target}.json"
+        with open(out_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"[BENCH] Written {out_path}")
+
+
+if __name__ == '__main__':
+    main()
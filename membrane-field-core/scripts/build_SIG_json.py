@@ -4,9 +4,12 @@ Build SIG.json from multiple KMZ sources:
 - FIELD_misc_export.kmz: phases, industrialParks, urbanFootprint, electricity
 - MERCADO_TRANSPORTE.kmz: lots (PATIOS folder)
 
+The default output, test/SIG16.json, is the lots file reynosaOverlay_v2 loads
+(resolved through test/manifest.json, so the published hashed copy is used).
+
 Usage:
     python scripts/build_SIG_json.py
-    python scripts/build_SIG_json.py --output test/SIG.json
+    python scripts/build_SIG_json.py --output test/SIG.json --no-manifest
 """
 
 import argparse
@@ -17,6 +20,8 @@ from datetime import datetime
 from pathlib import Path
 import math
 
+from asset_manifest import publish
+
 # KML namespace
 KML_NS = {'kml': 'http://www.opengis.net/kml/2.2'}
 
@@ -239,11 +244,13 @@ def build_sig_json(features):
 
 def main():
     parser = argparse.ArgumentParser(description='Build SIG.json from KMZ sources')
-    parser.add_argument('--output', '-o', default='test/SIG.json', help='Output JSON file')
+    parser.add_argument('--output', '-o', default='test/SIG16.json', help='Output JSON file')
     parser.add_argument('--field-kmz', default='FIELD_misc_export.kmz',
                         help='Path to FIELD_misc_export.kmz')
     parser.add_argument('--mercado-kmz', default='MERCADO_TRANSPORTE.kmz',
                         help='Path to MERCADO_TRANSPORTE.kmz')
+    parser.add_argument('--no-manifest', action='store_true',
+                        help='Do not publish a content-hashed copy into manifest.json')
     args = parser.parse_args()
 
     # Get script directory for relative paths
@@ -269,6 +276,9 @@ def main():
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(sig, f, indent=2, ensure_ascii=False)
 
+    if not args.no_manifest:
+        publish(output_path)
+
     # Summary
     layer_counts = {}
     for lot in sig['lots']:
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Columnar index of tracker comparison results across runs.
+
+Scans results/<stamp>/comparison_*.json and tracker/results/<stamp>/comparison_*.json
+and stores every scenario of every run as one .npz of sample columns plus a
+row in catalog.json (timestamp, runOpts, knobs, flattened final/summary and
+the scenario's delta vs baseline). Files already indexed with the same size
+and mtime are skipped, so re-running only ingests new result folders.
+
+Store layout (default results/index/):
+    catalog.json                      {"version", "files": {...}, "runs": [row, ...]}
+    runs/<source>__<stamp>__<run>__<i>.npz   t, injectedKg, ..., lotFillRatios (2-D)
+
+Nested sample fields are flattened with dots (serviceTimeStats.actual.mean);
+numeric lists (lotFillRatios) become 2-D columns padded with NaN.
+
+Usage:
+    python scripts/index_results.py                      # index new runs
+    python scripts/index_results.py --rebuild
+    python scripts/index_results.py --list --scenario Inovus --where dt=10 --last 20
+    python scripts/index_results.py --scalar summary.avgLotWaitPerTruck --scenario Inovus
+
+Query API:
+    from index_results import ResultsStore
+    store = ResultsStore()
+    rows = store.runs(scenario='Inovus', dt=10, last=20)
+    t, values = store.series(rows, 'truckHoursLost')     # values: (runs, samples)
+    dwell = store.scalars(rows, 'summary.avgLotWaitPerTruck')
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DIRS = {
+    'results': ROOT / 'results',
+    'tracker': ROOT / 'tracker' / 'results',
+}
+STORE_DIR = ROOT / 'results' / 'index'
+CATALOG_NAME = 'catalog.json'
+CATALOG_VERSION = 1
+
+COMPARISON_GLOB = '*/comparison_*.json'
+SLUG_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FLATTENING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def flatten(obj, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1}. Lists are kept as values."""
+    out = {}
+    for key, value in obj.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, f"{name}."))
+        else:
+            out[name] = value
+    return out
+
+
+def scalar(value):
+    """Numeric (or bool) JSON value as float, else None."""
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def sample_columns(samples):
+    """
+    Turn a list of sample dicts into {column: ndarray}.
+    Scalars -> float64 (n,), numeric lists -> float32 (n, width); missing -> NaN.
+    """
+    rows = [flatten(s) for s in samples]
+    n = len(rows)
+    names = []
+    for r in rows:
+        for k in r:
+            if k not in names:
+                names.append(k)
+
+    columns = {}
+    for name in names:
+        values = [r.get(name) for r in rows]
+        if any(isinstance(v, list) for v in values):
+            width = max(len(v) for v in values if isinstance(v, list))
+            arr = np.full((n, width), np.nan, dtype=np.float32)
+            for i, v in enumerate(values):
+                if isinstance(v, list):
+                    arr[i, :len(v)] = [x if isinstance(x, (int, float)) else np.nan for x in v]
+            columns[name] = arr
+            continue
+        nums = [scalar(v) for v in values]
+        if all(x is None for x in nums):
+            continue  # non-numeric column (strings)
+        columns[name] = np.array([np.nan if x is None else x for x in nums], dtype=np.float64)
+    return columns
+
+
+def scalar_fields(obj):
+    """Flattened numeric fields of a final/summary/delta dict."""
+    return {k: scalar(v) for k, v in flatten(obj or {}).items() if scalar(v) is not None}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STORE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ResultsStore:
+    """Run catalog plus per-scenario column files; see module docstring."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.dir = Path(store_dir)
+        self.catalog_path = self.dir / CATALOG_NAME
+        self.catalog = self._load_catalog()
+
+    def _load_catalog(self):
+        if self.catalog_path.exists():
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+            if catalog.get('version') == CATALOG_VERSION:
+                return catalog
+            print(f"[INDEX] Catalog version changed, rebuilding {self.catalog_path}")
+        return {'version': CATALOG_VERSION, 'files': {}, 'runs': []}
+
+    def save(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.catalog['runs'].sort(key=lambda r: (r['timestamp'] or '', r['id']))
+        tmp = self.catalog_path.with_suffix('.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.catalog, f, indent=1)
+        tmp.replace(self.catalog_path)
+
+    # ── Ingestion ────────────────────────────────────────────────────────────
+
+    def index(self, sources=SOURCE_DIRS, rebuild=False):
+        """Ingest new or changed comparison files. Returns (added, skipped, removed)."""
+        if rebuild:
+            for row in self.catalog['runs']:
+                (self.dir / row['npz']).unlink(missing_ok=True)
+            self.catalog = {'version': CATALOG_VERSION, 'files': {}, 'runs': []}
+
+        seen = set()
+        added = skipped = 0
+        for source, base in sources.items():
+            if not base.exists():
+                continue
+            for path in sorted(base.glob(COMPARISON_GLOB)):
+                rel = path.relative_to(ROOT).as_posix()
+                seen.add(rel)
+                st = path.stat()
+                signature = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+                known = self.catalog['files'].get(rel)
+                if known and all(known.get(k) == v for k, v in signature.items()):
+                    skipped += 1
+                    continue
+                self._drop_file(rel)
+                try:
+                    rows = self._ingest(source, path, rel)
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"[INDEX] Skipping {rel}: {e}")
+                    continue
+                self.catalog['files'][rel] = dict(signature, runs=[r['id'] for r in rows])
+                self.catalog['runs'].extend(rows)
+                added += 1
+                print(f"[INDEX] {rel}: {len(rows)} scenarios")
+
+        removed = [rel for rel in self.catalog['files'] if rel not in seen]
+        for rel in removed:
+            self._drop_file(rel)
+        self.save()
+        return added, skipped, len(removed)
+
+    def _drop_file(self, rel):
+        entry = self.catalog['files'].pop(rel, None)
+        if not entry:
+            return
+        ids = set(entry['runs'])
+        for row in self.catalog['runs']:
+            if row['id'] in ids:
+                (self.dir / row['npz']).unlink(missing_ok=True)
+        self.catalog['runs'] = [r for r in self.catalog['runs'] if r['id'] not in ids]
+
+    def _ingest(self, source, path, rel):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        meta = data['meta']
+        run_opts = dict(meta.get('runOpts') or {})
+        bundle = run_opts.get('bundlePath')
+        if bundle:
+            run_opts['bundle'] = re.split(r'[\\/]', bundle)[-1]
+        stamp = path.parent.name
+        run = path.stem[len('comparison_'):]
+        deltas = {d.get('treatment'): d for d in data.get('deltas', [])}
+
+        (self.dir / 'runs').mkdir(parents=True, exist_ok=True)
+        rows = []
+        for i, sc in enumerate(data['scenarios']):
+            name = sc.get('scenarioName', f'scenario{i}')
+            run_id = f"{source}/{stamp}/{run}/{i}"
+            npz = f"runs/{SLUG_RE.sub('_', f'{source}__{stamp}__{run}__{i}')}.npz"
+            columns = sample_columns(sc.get('samples', []))
+            np.savez(self.dir / npz, **columns)
+            # Both sides of a Baseline-vs-Baseline run share the name; only the treatment gets the delta
+            delta = deltas.get(name) if i > 0 else None
+            rows.append({
+                'id': run_id,
+                'file': rel,
+                'source': source,
+                'stamp': stamp,
+                'run': run,
+                'timestamp': meta.get('timestamp'),
+                'scenario': name,
+                'scenario_index': i,
+                'scenario_names': meta.get('scenarioNames', []),
+                'run_opts': run_opts,
+                'knobs': sc.get('knobs', {}),
+                'passed': sc.get('passed'),
+                'elapsed_s': sc.get('elapsedSeconds'),
+                'n_samples': len(sc.get('samples', [])),
+                'columns': {k: list(v.shape[1:]) for k, v in columns.items()},
+                'final': scalar_fields(sc.get('final')),
+                'summary': scalar_fields(sc.get('summary')),
+                'delta': scalar_fields({k: v for k, v in (delta or {}).items()
+                                        if k not in ('baseline', 'treatment')}) if delta else None,
+                'npz': npz,
+            })
+        return rows
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def runs(self, scenario=None, source=None, since=None, until=None, last=None,
+             passed=None, toggle=None, **run_opts):
+        """
+        Catalog rows in timestamp order, filtered by scenario name, source
+        ('results' / 'tracker'), ISO timestamp bounds (prefix compare, e.g.
+        since='2026-01-08'), passed flag, knob toggle, and exact runOpts
+        values (dt=10, duration=172800). last=N keeps the N most recent.
+        """
+        rows = []
+        for row in self.catalog['runs']:
+            ts = row['timestamp'] or ''
+            if scenario is not None and row['scenario'] != scenario:
+                continue
+            if source is not None and row['source'] != source:
+                continue
+            if since is not None and ts < since:
+                continue
+            if until is not None and ts[:len(until)] > until:
+                continue
+            if passed is not None and row['passed'] != passed:
+                continue
+            if toggle is not None and toggle not in row['knobs'].get('toggles', []):
+                continue
+            if any(row['run_opts'].get(k) != v for k, v in run_opts.items()):
+                continue
+            rows.append(row)
+        return rows[-last:] if last else rows
+
+    def load(self, row, columns=None):
+        """{column: ndarray} for one row (all columns unless `columns` is given)."""
+        with np.load(self.dir / row['npz']) as data:
+            names = columns or data.files
+            return {name: data[name] for name in names if name in data.files}
+
+    def series(self, rows, column, time_column='t'):
+        """
+        Align one sample column across runs on the union of sample times.
+        Returns (t, values) with values shaped (runs, len(t)) — or
+        (runs, len(t), width) for 2-D columns — and NaN where a run has no sample.
+        """
+        loaded = [self.load(row, [time_column, column]) for row in rows]
+        t = np.unique(np.concatenate([d[time_column] for d in loaded if time_column in d] or [np.empty(0)]))
+        widths = [d[column].shape[1:] for d in loaded if column in d]
+        trailing = max(widths, default=())
+        values = np.full((len(rows), len(t)) + tuple(trailing), np.nan)
+        for i, d in enumerate(loaded):
+            if column not in d or time_column not in d:
+                continue
+            idx = np.searchsorted(t, d[time_column])
+            col = d[column]
+            values[(i, idx) + tuple(slice(0, n) for n in col.shape[1:])] = col
+        return t, values
+
+    def scalars(self, rows, key):
+        """
+        One value per row as a float64 array. key is 'summary.<field>',
+        'final.<field>', 'delta.<field>', 'run_opts.<opt>' or a top-level
+        row field such as 'elapsed_s'. Missing values are NaN.
+        """
+        section, _, field = key.partition('.')
+        out = np.full(len(rows), np.nan)
+        for i, row in enumerate(rows):
+            value = (row.get(section) or {}).get(field) if field else row.get(section)
+            value = scalar(value)
+            if value is not None:
+                out[i] = value
+        return out
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def parse_where(items):
+    """['dt=10', 'bundle=bundle_baseline.json'] -> {'dt': 10, 'bundle': '...'}"""
+    opts = {}
+    for item in items or []:
+        key, _, value = item.partition('=')
+        try:
+            opts[key] = json.loads(value)
+        except ValueError:
+            opts[key] = value
+    return opts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index tracker comparison results into a columnar store')
+    parser.add_argument('--store', default=str(STORE_DIR), help='Store directory')
+    parser.add_argument('--rebuild', action='store_true', help='Drop the store and re-index everything')
+    parser.add_argument('--no-index', action='store_true', help='Query the existing store without scanning')
+    parser.add_argument('--list', action='store_true', help='List matching runs')
+    parser.add_argument('--scalar', nargs='+', metavar='KEY',
+                        help='Print per-run values, e.g. summary.truckHoursLost_final delta.truckHoursLost')
+    parser.add_argument('--scenario', help='Filter by scenario name')
+    parser.add_argument('--source', choices=sorted(SOURCE_DIRS), help='Filter by results root')
+    parser.add_argument('--since', help='ISO timestamp prefix lower bound, e.g. 2026-01-08')
+    parser.add_argument('--until', help='ISO timestamp prefix upper bound')
+    parser.add_argument('--toggle', help='Filter by knob toggle (Inovus, Twinspan, ...)')
+    parser.add_argument('--where', nargs='*', metavar='OPT=VALUE', help='Exact runOpts matches, e.g. dt=10')
+    parser.add_argument('--last', type=int, help='Keep only the N most recent runs')
+    args = parser.parse_args()
+
+    store = ResultsStore(args.store)
+    if not args.no_index:
+        added, skipped, removed = store.index(rebuild=args.rebuild)
+        print(f"[INDEX] {added} files indexed, {skipped} unchanged, {removed} removed "
+              f"-> {len(store.catalog['runs'])} scenario runs in {store.dir}")
+
+    if not (args.list or args.scalar):
+        return
+
+    rows = store.runs(scenario=args.scenario, source=args.source, since=args.since, until=args.until,
+                      last=args.last, toggle=args.toggle, **parse_where(args.where))
+    keys = args.scalar or []
+    print(f"\n  {'timestamp':20} {'run':28} {'scenario':24} {'dt':>4} " + ' '.join(f"{k:>24}" for k in keys))
+    columns = [store.scalars(rows, k) for k in keys]
+    for i, row in enumerate(rows):
+        ts = (row['timestamp'] or '')[:19]
+        values = ' '.join(f"{c[i]:>24.4g}" for c in columns)
+        print(f"  {ts:20} {row['stamp'] + '/' + row['run']:28} {row['scenario']:24} "
+              f"{row['run_opts'].get('dt', ''):>4} {values}")
+    print(f"\n  {len(rows)} runs")
+
+
+if __name__ == '__main__':
+    main()
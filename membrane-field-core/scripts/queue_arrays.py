@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Dense (hour x POE) float32 arrays for *_queue_results.json.
+
+The queue results files are nested dicts: {"<hour>": {"<poe>": minutes}} for
+hours 0-23, plus "_meta" and "_decomposed" ({"<hour>": {"<poe>": {"total",
+"dwell", "queue_delay"}}}). convert() writes them as memory-mappable .npy files
+with a fixed POE column order and a JSON header sidecar:
+
+    test/bundle_baseline_queue_results.npy              float32 (24, 24)  queue delay
+    test/bundle_baseline_queue_results.decomposed.npy   float32 (3, 24, 24)  total/dwell/queue_delay
+    test/bundle_baseline_queue_results.header.json      poes, hours, components, _meta
+
+Values with |x| < --flush-below (default 1e-6 min) are stored as exact 0.
+
+Usage:
+    python scripts/queue_arrays.py test/bundle_baseline_queue_results.json test/interserrana_bundle_queue_results.json
+    python scripts/queue_arrays.py --diff test/interserrana_bundle_queue_results.npy test/bundle_baseline_queue_results.npy
+
+API:
+    from queue_arrays import load, stack, diff, aggregate
+    names, cube = stack(['test/bundle_baseline_queue_results.npy', ...])   # (scenarios, 24, 24)
+    delta = diff(cube, baseline=0)                                        # (scenarios, 24, 24)
+    daily = aggregate(cube, 'sum', over='hour')                           # (scenarios, 24 POEs)
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+HEADER_VERSION = 1
+HOURS = 24
+FLUSH_BELOW = 1e-6    # minutes (60 µs); solver noise like 1.04e-09 becomes 0
+
+# Fixed column order. Must not be reordered: saved arrays index into it.
+# New POEs are appended at the end (older files then lack that column).
+QUEUE_POES = [
+    'brownsville', 'del_rio', 'eagle_pass', 'laredo', 'hidalgo_pharr', 'rio_grande_city',
+    'progreso', 'roma', 'ysleta', 'el_paso', 'presidio', 'columbus',
+    'santa_teresa', 'tecate', 'otay_mesa', 'calexico_east', 'douglas', 'lukeville',
+    'naco', 'nogales', 'san_luis', 'laredo_colombia', 'brownsville_los_indios', 'brownsville_veterans',
+]
+POE_INDEX = {poe: i for i, poe in enumerate(QUEUE_POES)}
+COMPONENTS = ['total', 'dwell', 'queue_delay']
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONVERSION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def array_paths(path):
+    """queue_results.json|.npy -> (values .npy, decomposed .npy, header .json)"""
+    path = Path(path)
+    stem = path.with_suffix('') if path.suffix in ('.json', '.npy') else path
+    return (stem.with_suffix('.npy'),
+            stem.with_name(stem.name + '.decomposed.npy'),
+            stem.with_name(stem.name + '.header.json'))
+
+
+def flush_small(arr, threshold=FLUSH_BELOW):
+    """Zero |x| < threshold in place (also removes float32 subnormals). Returns count flushed."""
+    small = (np.abs(arr) < threshold) & (arr != 0)
+    count = int(small.sum())
+    arr[small] = 0
+    return count
+
+
+def to_dense(data):
+    """Parse a queue results dict into (values (24, P), decomposed (3, 24, P) or None)."""
+    unknown = sorted({poe for h in range(HOURS) for poe in data.get(str(h), {})} - POE_INDEX.keys())
+    if unknown:
+        raise ValueError(f"POEs not in QUEUE_POES (append them there): {unknown}")
+
+    values = np.zeros((HOURS, len(QUEUE_POES)), dtype=np.float32)
+    for h in range(HOURS):
+        for poe, v in data.get(str(h), {}).items():
+            values[h, POE_INDEX[poe]] = v
+
+    decomposed = None
+    if '_decomposed' in data:
+        decomposed = np.zeros((len(COMPONENTS), HOURS, len(QUEUE_POES)), dtype=np.float32)
+        for h in range(HOURS):
+            for poe, parts in data['_decomposed'].get(str(h), {}).items():
+                for c, name in enumerate(COMPONENTS):
+                    decomposed[c, h, POE_INDEX[poe]] = parts.get(name, 0.0)
+    return values, decomposed
+
+
+def convert(path, flush_below=FLUSH_BELOW):
+    """Write the .npy arrays and header for one queue results JSON. Returns the values path."""
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    values, decomposed = to_dense(data)
+    flushed = flush_small(values, flush_below)
+    values_path, decomposed_path, header_path = array_paths(path)
+    np.save(values_path, values)
+    if decomposed is not None:
+        flushed += flush_small(decomposed, flush_below)
+        np.save(decomposed_path, decomposed)
+
+    header = {
+        'version': HEADER_VERSION,
+        'source': path.name,
+        'dtype': 'float32',
+        'shape': list(values.shape),
+        'axes': ['hour', 'poe'],
+        'poes': QUEUE_POES,
+        'components': COMPONENTS if decomposed is not None else None,
+        'flush_below': flush_below,
+        'flushed': flushed,
+        'meta': data.get('_meta', {}),
+    }
+    with open(header_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2)
+
+    print(f"[QUEUE] {path.name} -> {values_path.name} {values.shape} "
+          f"({values_path.stat().st_size / 1000:.1f} KB, {flushed} values flushed to 0)")
+    return values_path
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LOADING + VECTOR HELPERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def load(path, decomposed=False, mmap=True):
+    """
+    (array, header) for a converted file. Arrays are read-only memmaps unless
+    mmap=False. Files written before a POE was appended are padded with 0.
+    """
+    values_path, decomposed_path, header_path = array_paths(path)
+    with open(header_path, 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    if header.get('version') != HEADER_VERSION:
+        raise ValueError(f"{header_path}: unsupported header version {header.get('version')}")
+    if header['poes'] != QUEUE_POES[:len(header['poes'])]:
+        raise ValueError(f"{header_path}: POE order does not match QUEUE_POES; re-run convert")
+
+    arr = np.load(decomposed_path if decomposed else values_path, mmap_mode='r' if mmap else None)
+    missing = len(QUEUE_POES) - arr.shape[-1]
+    if missing:
+        arr = np.pad(arr, [(0, 0)] * (arr.ndim - 1) + [(0, missing)])
+    return arr, header
+
+
+def stack(paths, decomposed=False):
+    """(names, cube) with cube shaped (scenarios, 24, P) — or (scenarios, 3, 24, P)."""
+    arrays, names = [], []
+    for p in paths:
+        arr, header = load(p, decomposed)
+        arrays.append(arr)
+        names.append(Path(header['source']).stem.replace('_queue_results', ''))
+    return names, np.stack(arrays)
+
+
+def diff(cube, baseline=0):
+    """Every scenario minus cube[baseline] (broadcast); baseline row becomes 0."""
+    return cube - cube[baseline]
+
+
+def aggregate(cube, fn='sum', over='hour'):
+    """
+    Reduce over 'hour' or 'poe' with sum, mean, max, or argmax (peak hour /
+    worst POE index). Works on any leading scenario/component axes.
+    """
+    axis = {'hour': -2, 'poe': -1}[over]
+    reducers = {'sum': np.sum, 'mean': np.mean, 'max': np.max, 'argmax': np.argmax}
+    if fn not in reducers:
+        raise ValueError(f"fn must be one of {sorted(reducers)}")
+    return reducers[fn](cube, axis=axis)
+
+
+def poe_column(cube, poe):
+    """Slice one POE's hourly series: (..., 24)."""
+    return cube[..., POE_INDEX[poe]]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def print_diff(treatment, baseline):
+    names, cube = stack([baseline, treatment])
+    delta = diff(cube)[1]
+    daily = aggregate(delta, 'sum')
+    peak = aggregate(np.abs(delta), 'argmax')
+    print(f"\n  {names[1]} - {names[0]} (queue delay, minutes)")
+    print(f"  {'POE':24} {'sum Δ':>10} {'max |Δ|':>10} {'peak hour':>10}")
+    for i in np.argsort(-np.abs(daily)):
+        if daily[i] == 0 and not delta[:, i].any():
+            continue
+        print(f"  {QUEUE_POES[i]:24} {daily[i]:>10.1f} {np.abs(delta[:, i]).max():>10.1f} {peak[i]:>10d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert queue results JSON to dense .npy arrays')
+    parser.add_argument('files', nargs='*', help='*_queue_results.json files to convert')
+    parser.add_argument('--flush-below', type=float, default=FLUSH_BELOW,
+                        help='Store |value| below this as 0 (minutes)')
+    parser.add_argument('--diff', nargs=2, metavar=('TREATMENT', 'BASELINE'),
+                        help='Print per-POE differences between two converted files')
+    args = parser.parse_args()
+
+    for f in args.files:
+        convert(f, args.flush_below)
+    if args.diff:
+        print_diff(*args.diff)
+
+
+if __name__ == '__main__':
+    main()
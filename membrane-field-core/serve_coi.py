@@ -1,23 +1,406 @@
 #!/usr/bin/env python3
 """
 HTTP server with Cross-Origin Isolation headers for SharedArrayBuffer.
-Usage: python serve_coi.py [port]
+Usage: python serve_coi.py [port] [--metrics-interval SECONDS] [--logfile PATH | --no-log]
 
 Run from membrane-field-core directory:
   python serve_coi.py 8080
 
 Then open: http://localhost:8080/test/testBundle.html
+
+Data files published by scripts/asset_manifest.py are served with
+Cache-Control: immutable (hashed names) and no-cache (manifest.json).
+
+Same-origin log ingestion (POST /log, /log/batch, /clear) writes to
+mission_critical.log with the same filter and writer as log_server.py, so
+SAB runs can log without a cross-origin request. Writer flags
+(--coalesce, --rotate-bytes, ...) are shared with log_server.py.
+
+Request metrics (per-path counts, bytes, TTFB/latency percentiles, active
+connections) are exposed at:
+  http://localhost:8080/__metrics                    JSON
+  http://localhost:8080/__metrics?format=prometheus  Prometheus text
+  http://localhost:8080/__metrics?format=log         log ingest/writer stats
 """
 
+import argparse
 import http.server
+import json
 import socketserver
-import sys
+import threading
+import time
 import os
+import re
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+
+import log_server
+
+METRICS_PATH = '/__metrics'
+
+# Content-hashed assets written by scripts/asset_manifest.py (<stem>.<12 hex>.<ext>)
+HASHED_ASSET_RE = re.compile(r'^.+\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+# Same-origin log routes, handled by LogIngest off the request threads
+LOG_ROUTES = ('/log', '/log/batch', '/clear')
+INGEST_QUEUE = 1000          # pending POST bodies before answering 503
+
+# Metric keys for requests that should not get their own path entry
+BAD_REQUEST_KEY = '(bad request)'   # request line did not parse
+CLIENT_ERROR_KEY = '(4xx)'          # arbitrary 404s etc. would grow paths without bound
+OTHER_PATHS_KEY = '(other)'         # beyond MAX_PATHS distinct paths
+MAX_PATHS = 500
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram. Percentiles are bucket upper bounds."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        i = 0
+        while i < len(self.bounds) and value_ms > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += 1
+        self.sum += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, q):
+        if self.total == 0:
+            return None
+        rank = q * self.total
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                # Overflow bucket has no upper bound: report the observed max
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.total,
+            'mean': round(self.sum / self.total, 3) if self.total else None,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 3),
+        }
+
+
+class PathStats:
+    def __init__(self):
+        self.requests = 0
+        self.bytes_sent = 0
+        self.status = {}
+        self.ttfb = Histogram()
+        self.latency = Histogram()
+
+
+class RequestMetrics:
+    """Thread-safe request counters shared by all handler threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.active_connections = 0
+        self.paths = {}
+        self.all = PathStats()
+
+    def connection_opened(self):
+        with self.lock:
+            self.active_connections += 1
+
+    def connection_closed(self):
+        with self.lock:
+            self.active_connections -= 1
+
+    def record(self, path, status, nbytes, ttfb_ms, latency_ms):
+        if path is None:
+            path = BAD_REQUEST_KEY
+        elif 400 <= status < 500:
+            path = CLIENT_ERROR_KEY
+        with self.lock:
+            stats = self.paths.get(path)
+            if stats is None:
+                if len(self.paths) >= MAX_PATHS:
+                    path = OTHER_PATHS_KEY
+                stats = self.paths.get(path) or self.paths.setdefault(path, PathStats())
+            for s in (stats, self.all):
+                s.requests += 1
+                s.bytes_sent += nbytes
+                s.status[status] = s.status.get(status, 0) + 1
+                if ttfb_ms is not None:
+                    s.ttfb.observe(ttfb_ms)
+                s.latency.observe(latency_ms)
+
+    def to_json(self):
+        def entry(s):
+            return {
+                'requests': s.requests,
+                'bytes_sent': s.bytes_sent,
+                'status': {str(k): v for k, v in sorted(s.status.items())},
+                'ttfb_ms': s.ttfb.summary(),
+                'latency_ms': s.latency.summary(),
+            }
+
+        with self.lock:
+            return {
+                'uptime_s': round(time.time() - self.started, 1),
+                'active_connections': self.active_connections,
+                'total': entry(self.all),
+                'paths': {p: entry(s) for p, s in sorted(self.paths.items())},
+            }
+
+    def to_prometheus(self):
+        lines = [
+            '# HELP coi_active_connections Open client connections.',
+            '# TYPE coi_active_connections gauge',
+        ]
+
+        def label(path):
+            return path.replace('\\', '\\\\').replace('"', '\\"')
+
+        with self.lock:
+            lines.append(f'coi_active_connections {self.active_connections}')
+
+            lines.append('# HELP coi_requests_total Requests served, by path and status.')
+            lines.append('# TYPE coi_requests_total counter')
+            for path, s in sorted(self.paths.items()):
+                for status, count in sorted(s.status.items()):
+                    lines.append(f'coi_requests_total{{path="{label(path)}",status="{status}"}} {count}')
+
+            lines.append('# HELP coi_bytes_sent_total Response bytes written, by path.')
+            lines.append('# TYPE coi_bytes_sent_total counter')
+            for path, s in sorted(self.paths.items()):
+                lines.append(f'coi_bytes_sent_total{{path="{label(path)}"}} {s.bytes_sent}')
+
+            for name, attr, help_text in (
+                ('coi_ttfb_seconds', 'ttfb', 'Time from request line to response headers.'),
+                ('coi_request_duration_seconds', 'latency', 'Time from request line to last byte.'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for path, s in sorted(self.paths.items()):
+                    h = getattr(s, attr)
+                    cumulative = 0
+                    for bound, count in zip(h.bounds, h.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{path="{label(path)}",le="{bound / 1000:g}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{path="{label(path)}",le="+Inf"}} {h.total}')
+                    lines.append(f'{name}_sum{{path="{label(path)}"}} {h.sum / 1000:.6f}')
+                    lines.append(f'{name}_count{{path="{label(path)}"}} {h.total}')
+
+        return '\n'.join(lines) + '\n'
+
+    def summary_line(self):
+        with self.lock:
+            lat = self.all.latency.summary()
+            ttfb = self.all.ttfb.summary()
+            return (f"[METRICS] req={self.all.requests} bytes={self.all.bytes_sent / 1_000_000:.1f}MB "
+                    f"active={self.active_connections} "
+                    f"ttfb p50/p95/p99={ttfb['p50']}/{ttfb['p95']}/{ttfb['p99']}ms "
+                    f"latency p50/p95/p99={lat['p50']}/{lat['p95']}/{lat['p99']}ms")
+
+
+METRICS = RequestMetrics()
+
+
+class LogIngest:
+    """
+    Parses and filters log POST bodies on one background thread so request
+    threads only read the body and answer 202. Bodies are handled in arrival
+    order, so a /clear lands between the batches around it.
+    """
+
+    def __init__(self, writer, maxlen=INGEST_QUEUE):
+        self.writer = writer
+        self.maxlen = maxlen
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.counters = {'bodies': 0, 'lines': 0, 'written': 0, 'rejected': 0, 'errors': 0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='log-ingest', daemon=True)
+        self._thread.start()
+
+    def put(self, route, body):
+        """Queue one POST body. Returns False when the queue is full."""
+        with self.cond:
+            if len(self.queue) >= self.maxlen:
+                self.counters['rejected'] += 1
+                return False
+            self.queue.append((route, body))
+            self.cond.notify()
+        return True
+
+    def stats(self):
+        with self.cond:
+            return dict(self.counters, pending=len(self.queue), writer=self.writer.stats())
+
+    def close(self):
+        with self.cond:
+            self._closed = True
+            self.cond.notify()
+        self._thread.join()
+        self.writer.close()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self._closed:
+                    self.cond.wait()
+                if not self.queue:
+                    return
+                route, body = self.queue.popleft()
+            try:
+                if route == '/clear':
+                    self.writer.clear()
+                    print(f"[LOG] Log cleared -> {self.writer.path}")
+                    entries = []
+                elif route == '/log':
+                    entries = [(str(json.loads(body).get('msg', '')), None)]
+                else:
+                    entries = log_server.parse_batch(body)
+                # Under "block" one body waits at most BLOCK_TIMEOUT in total
+                deadline = time.monotonic() + log_server.BLOCK_TIMEOUT
+                written = sum(log_server.accept(self.writer, msg, ts, deadline) for msg, ts in entries)
+            except Exception as e:
+                # A bad body is counted and skipped; the ingest thread keeps running
+                with self.cond:
+                    self.counters['errors'] += 1
+                print(f"[LOG] Skipped {route} body: {e!r}")
+                continue
+            with self.cond:
+                self.counters['bodies'] += 1
+                self.counters['lines'] += len(entries)
+                self.counters['written'] += written
+
+
+class CountingWriter:
+    """Wraps the socket writer to count response bytes and mark first byte."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes = 0
+        self.first_byte_at = None
+
+    def write(self, data):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter()
+        n = self.raw.write(data)
+        self.bytes += len(data)
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
 
-PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
 
 class COIHandler(http.server.SimpleHTTPRequestHandler):
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+        METRICS.connection_opened()
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            METRICS.connection_closed()
+
+    def parse_request(self):
+        # Called right after the request line is read: start the clock here
+        # so keep-alive idle time is not counted as latency.
+        self._request_start = time.perf_counter()
+        self.wfile.bytes = 0
+        self.wfile.first_byte_at = None
+        ok = super().parse_request()
+        if ok:
+            self._request_path = urlsplit(self.path).path
+        return ok
+
+    def handle_one_request(self):
+        # self.path is only set (for this request) when parse_request succeeds
+        self._request_start = None
+        self._request_path = None
+        super().handle_one_request()
+        if self._request_start is None or not hasattr(self, '_status'):
+            return
+        end = time.perf_counter()
+        first = self.wfile.first_byte_at
+        ttfb_ms = (first - self._request_start) * 1000 if first is not None else None
+        METRICS.record(self._request_path, self._status, self.wfile.bytes,
+                       ttfb_ms, (end - self._request_start) * 1000)
+        del self._status
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == METRICS_PATH:
+            self.send_metrics(parse_qs(url.query))
+            return
+        super().do_GET()
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        ingest = getattr(self.server, 'ingest', None)
+        if path not in LOG_ROUTES or ingest is None:
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8', errors='replace')
+        self.send_response(202 if ingest.put(path, body) else 503)
+        self.send_header('Content-Length', '0')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+
+    def send_head(self):
+        name = urlsplit(self.path).path.rsplit('/', 1)[-1]
+        if name == MANIFEST_NAME:
+            self._cache_control = 'no-cache'
+        elif HASHED_ASSET_RE.match(name):
+            self._cache_control = IMMUTABLE_CACHE
+        return super().send_head()
+
+    def send_metrics(self, query):
+        fmt = query.get('format', [''])[0]
+        if fmt == 'log':
+            ingest = getattr(self.server, 'ingest', None)
+            body = json.dumps(ingest.stats() if ingest else None, indent=2).encode('utf-8')
+            content_type = 'application/json'
+        elif fmt in ('prometheus', 'prom') or (not fmt and 'text/plain' in self.headers.get('Accept', '')):
+            body = METRICS.to_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(METRICS.to_json(), indent=2).encode('utf-8')
+            content_type = 'application/json'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
     def end_headers(self):
+        cache_control = getattr(self, '_cache_control', None)
+        if cache_control:
+            if self._status in (200, 304):
+                self.send_header('Cache-Control', cache_control)
+            self._cache_control = None
         self.send_header('Cross-Origin-Opener-Policy', 'same-origin')
         self.send_header('Cross-Origin-Embedder-Policy', 'credentialless')
         self.send_header('Cross-Origin-Resource-Policy', 'same-origin')
@@ -28,17 +411,55 @@ class COIHandler(http.server.SimpleHTTPRequestHandler):
         if args[1][0] != '2':  # Not 2xx status
             super().log_message(format, *args)
 
+
 class ThreadedHTTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     allow_reuse_address = True
     daemon_threads = True
 
-print(f"Serving from: {os.getcwd()}")
-print(f"URL: http://localhost:{PORT}/test/testBundle.html")
-print("crossOriginIsolated: true")
-print("Ctrl+C to stop\n")
 
-with ThreadedHTTPServer(("", PORT), COIHandler) as httpd:
-    try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\nStopped.")
+def start_metrics_reporter(interval):
+    """Print a one-line metrics summary every `interval` seconds."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            print(METRICS.summary_line(), flush=True)
+
+    threading.Thread(target=loop, name='metrics-reporter', daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Static server with Cross-Origin Isolation headers')
+    parser.add_argument('port', nargs='?', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--metrics-interval', type=float, default=0,
+                        help='Print a request metrics summary every N seconds (0 = off)')
+    parser.add_argument('--logfile', default=log_server.LOGFILE,
+                        help='Where POST /log and /log/batch lines are written')
+    parser.add_argument('--no-log', action='store_true', help='Disable the same-origin log routes')
+    log_server.add_writer_args(parser.add_argument_group('log writer (same flags as log_server.py)'))
+    args = parser.parse_args()
+
+    print(f"Serving from: {os.getcwd()}")
+    print(f"URL: http://localhost:{args.port}/test/testBundle.html")
+    print(f"Metrics: http://localhost:{args.port}{METRICS_PATH}")
+    if not args.no_log:
+        print(f"Log: POST /log, /log/batch, /clear -> {args.logfile}")
+    print("crossOriginIsolated: true")
+    print("Ctrl+C to stop\n")
+
+    if args.metrics_interval > 0:
+        start_metrics_reporter(args.metrics_interval)
+
+    with ThreadedHTTPServer(("", args.port), COIHandler) as httpd:
+        httpd.ingest = None if args.no_log else LogIngest(log_server.make_writer(args, args.logfile))
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\n{METRICS.summary_line()}")
+            print("Stopped.")
+        finally:
+            if httpd.ingest:
+                httpd.ingest.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Store a scenario bundle as a sparse delta against a base bundle.
+
+Delta file:
+    {"_delta": {"version": 1, "base": "bundle_baseline.json", "base_hash": "<12 hex>",
+                "target": "interserrana_bundle.json", "target_hash": "<12 hex>",
+                "output_hash": "<12 hex>"},
+     "ops": <node>}
+
+output_hash is the hash of the compact JSON decode() writes (equal to
+target_hash when the target was already compacted); decode() checks its
+output against it (target_hash for deltas without it) and raises on mismatch.
+
+A node describes how one object (or equal-length list) changes:
+    "+": {key: value}      added keys, or values replaced outright
+    "-": [key, ...]        removed keys (objects only)
+    "~": {key: diff}       numbers stored as target - base (only when base + diff == target exactly)
+    ">": {key: node}       nested changes
+    "order": [key, ...]    final key order, only when it differs from base order
+    "#": n                 marks a list node of length n (keys are indices)
+Lists whose length changes are replaced via "+".
+
+encode() always decodes its own output and compares the serialized JSON with
+the target, so a written delta is guaranteed to reproduce the scenario
+byte-for-byte (as json.dump'd). overlay/bundleDelta.js applies the same format
+in the browser on top of an already loaded baseline: testBundle.html fetches a
+published (--publish) interserrana delta instead of the full bundle whenever
+its base_hash matches the published baseline.
+
+Usage:
+    python test/bundle_delta.py encode test/bundle_baseline.json test/interserrana_bundle.json
+    python test/bundle_delta.py decode test/bundle_baseline.json test/interserrana_bundle.delta.json -o out.json
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from asset_manifest import HASH_LENGTH, content_hash, publish
+
+DELTA_VERSION = 1
+
+
+def serialize(obj):
+    """Compact JSON text, as decode() writes it."""
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _numeric_diff(base, target):
+    """target - base if it round-trips exactly (same type, no rounding), else None."""
+    if type(base) is not type(target) or not _is_number(base):
+        return None
+    if base == target:
+        return None
+    d = target - base
+    return d if base + d == target and type(base + d) is type(target) else None
+
+
+def diff(base, target):
+    """Node turning `base` into `target`, or None if they are identical."""
+    if isinstance(base, dict) and isinstance(target, dict):
+        keys = list(target)
+        node = {}
+        removed = [k for k in base if k not in target]
+        if removed:
+            node['-'] = removed
+        for k in keys:
+            if k not in base:
+                node.setdefault('+', {})[k] = target[k]
+                continue
+            _diff_value(node, k, base[k], target[k])
+        expected = [k for k in base if k in target] + [k for k in keys if k not in base]
+        if expected != keys:
+            node['order'] = keys
+        return node or None
+
+    if isinstance(base, list) and isinstance(target, list) and len(base) == len(target):
+        node = {}
+        for i, (b, t) in enumerate(zip(base, target)):
+            _diff_value(node, str(i), b, t)
+        if not node:
+            return None
+        node['#'] = len(target)
+        return node
+
+    return None if _same_scalar(base, target) else {'=': target}
+
+
+def _diff_value(node, key, b, t):
+    if (isinstance(b, dict) and isinstance(t, dict)) or \
+            (isinstance(b, list) and isinstance(t, list) and len(b) == len(t)):
+        child = diff(b, t)
+        if child is not None:
+            node.setdefault('>', {})[key] = child
+        return
+    if _same_scalar(b, t):
+        return
+    d = _numeric_diff(b, t)
+    if d is not None:
+        node.setdefault('~', {})[key] = d
+        return
+    node.setdefault('+', {})[key] = t
+
+
+def _same_scalar(a, b):
+    """Equal including int/float distinction (1 != 1.0 once serialized)."""
+    return type(a) is type(b) and not isinstance(a, (dict, list)) and a == b
+
+
+def apply(base, node):
+    """
+    Return base with `node` applied. base is not modified; unchanged
+    subtrees are shared with it.
+    """
+    if node is None:
+        return base
+    if '=' in node:
+        return node['=']
+
+    if '#' in node:
+        out = list(base)
+        for k, v in node.get('+', {}).items():
+            out[int(k)] = v
+        for k, d in node.get('~', {}).items():
+            out[int(k)] = out[int(k)] + d
+        for k, child in node.get('>', {}).items():
+            out[int(k)] = apply(out[int(k)], child)
+        return out
+
+    removed = set(node.get('-', ()))
+    out = {k: v for k, v in base.items() if k not in removed}
+    for k, d in node.get('~', {}).items():
+        out[k] = out[k] + d
+    for k, child in node.get('>', {}).items():
+        out[k] = apply(out[k], child)
+    for k, v in node.get('+', {}).items():
+        out[k] = v
+    if 'order' in node:
+        out = {k: out[k] for k in node['order']}
+    return out
+
+
+def encode(base_path, target_path, out_path=None):
+    """Write <target>.delta.json next to the target. Returns the delta path."""
+    base_path, target_path = Path(base_path), Path(target_path)
+    with open(base_path, 'r') as f:
+        base = json.load(f)
+    with open(target_path, 'r') as f:
+        target = json.load(f)
+
+    ops = diff(base, target) or {}
+    decoded = serialize(apply(base, ops))
+    if decoded != serialize(target):
+        raise AssertionError(f"delta round trip failed for {target_path.name}")
+
+    delta = {
+        '_delta': {
+            'version': DELTA_VERSION,
+            'base': base_path.name,
+            'base_hash': content_hash(base_path),
+            'target': target_path.name,
+            'target_hash': content_hash(target_path),
+            'output_hash': hashlib.sha256(decoded.encode()).hexdigest()[:HASH_LENGTH],
+        },
+        'ops': ops,
+    }
+    out_path = Path(out_path) if out_path else target_path.with_name(target_path.stem + '.delta.json')
+    with open(out_path, 'w') as f:
+        json.dump(delta, f, separators=(',', ':'))
+
+    target_size = target_path.stat().st_size
+    delta_size = out_path.stat().st_size
+    print(f"  {target_path.name} vs {base_path.name}: {target_size/1_000_000:.1f} MB -> "
+          f"{delta_size/1_000_000:.2f} MB delta ({100*(1-delta_size/target_size):.0f}% smaller, round trip OK)")
+    return out_path
+
+
+def decode(base_path, delta_path, out_path=None):
+    """Rebuild the target bundle from base + delta and verify its hash. Returns the output path."""
+    base_path, delta_path = Path(base_path), Path(delta_path)
+    with open(delta_path, 'r') as f:
+        delta = json.load(f)
+    header = delta['_delta']
+    if header.get('version') != DELTA_VERSION:
+        raise ValueError(f"{delta_path.name}: unsupported delta version {header.get('version')}")
+    if content_hash(base_path) != header['base_hash']:
+        raise ValueError(f"{base_path.name} does not match the base this delta was built from "
+                         f"({header['base']} {header['base_hash']})")
+
+    with open(base_path, 'r') as f:
+        base = json.load(f)
+    target = apply(base, delta['ops'])
+
+    out_path = Path(out_path) if out_path else delta_path.with_name(header['target'])
+    with open(out_path, 'w') as f:
+        f.write(serialize(target))
+    expected = header.get('output_hash', header['target_hash'])
+    actual = content_hash(out_path)
+    if actual != expected:
+        out_path.unlink()
+        raise ValueError(f"{out_path.name}: decoded hash {actual} does not match "
+                         f"{header['target']} {expected}")
+    print(f"  {delta_path.name} + {base_path.name} -> {out_path.name} (hash OK)")
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Encode/decode scenario bundles as deltas against a base bundle')
+    sub = parser.add_subparsers(dest='command', required=True)
+    enc = sub.add_parser('encode', help='Write <target>.delta.json')
+    enc.add_argument('base')
+    enc.add_argument('targets', nargs='+')
+    enc.add_argument('-o', '--output', help='Output path (single target only)')
+    enc.add_argument('--publish', action='store_true', help='Register the delta in manifest.json')
+    dec = sub.add_parser('decode', help='Rebuild a bundle from base + delta')
+    dec.add_argument('base')
+    dec.add_argument('delta')
+    dec.add_argument('-o', '--output', help='Output path (default: the target name next to the delta)')
+    args = parser.parse_args()
+
+    if args.command == 'encode':
+        if args.output and len(args.targets) > 1:
+            parser.error('-o takes a single target')
+        for target in args.targets:
+            out = encode(args.base, target, args.output)
+            if args.publish:
+                publish(out)
+    else:
+        decode(args.base, args.delta, args.output)
+    print("Done!")
+
+
+if __name__ == '__main__':
+    main()
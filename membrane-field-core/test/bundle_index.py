@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Byte-offset index for bundle JSON (random access without json.load of the whole file).
+
+One pass over the file records [start, end) byte spans for:
+  - every top-level section (metadata, geometry, flow_kg_by_poe, ...)
+  - every key of each top-level object section (flow_kg_by_poe.<poe>, geometry.transform, ...)
+  - every entry of segments_in_roi, keyed by segment_id
+    (geometry.segments_in_roi in full bundles, segments_in_roi in geometry.json)
+
+The index is saved next to the bundle as <name>.idx.json and rebuilt when the
+bundle's size or mtime changes. LazyBundle mmaps the file and json-parses only
+the requested span.
+
+Usage:
+    python test/bundle_index.py test/bundle_baseline.json test/geometry.json
+    python test/bundle_index.py test/bundle_baseline.json --segment REYN_71
+
+    from bundle_index import LazyBundle
+    with LazyBundle('test/bundle_baseline.json') as b:
+        seg = b.segment('REYN_71')
+        pharr = b.get('flow_kg_by_poe', 'hidalgo_pharr')
+"""
+import argparse
+import json
+import mmap
+import re
+import time
+from pathlib import Path
+
+INDEX_VERSION = 2   # 2: non-string segment_id values indexed by their own text
+SEGMENTS_KEY = 'segments_in_roi'
+SEGMENT_ID_KEY = b'"segment_id"'
+
+# Strings (with escapes, so brackets inside them are skipped) and brackets.
+# Numbers, commas and colons never become tokens.
+TOKEN_RE = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+COLON_RE = re.compile(rb'\s*:\s*')
+SCALAR_RE = re.compile(rb'-?[0-9][0-9.eE+-]*|true|false|null')
+# A string-free array value (coordinates, hourly lists): skipped in one match
+# instead of token by token. Only trusted when its brackets balance.
+NUMERIC_ARRAY_RE = re.compile(rb'\[[^"{}]*\]')
+
+OPEN_OBJECT, OPEN_ARRAY = ord('{'), ord('[')
+QUOTE = ord('"')
+
+
+class Frame:
+    __slots__ = ('start', 'is_object', 'key', 'record', 'segment_id', 'is_segments')
+
+    def __init__(self, start, is_object, key, record, is_segments):
+        self.start = start
+        self.is_object = is_object
+        self.key = key
+        self.record = record
+        self.segment_id = None
+        self.is_segments = is_segments
+
+
+def build_index(buf):
+    """
+    Scan a JSON document (bytes or mmap) once and return the span index:
+    {"sections": {key: [s, e]}, "children": {section: {key: [s, e]}},
+     "segments": {"path": "geometry.segments_in_roi", "ids": {segment_id: [s, e]}}}
+    """
+    sections, children, segment_ids = {}, {}, {}
+    segments_path = None
+    stack = []
+    pending = None  # (value_start, key, record) for a container value about to open
+    search = TOKEN_RE.search
+    pos = 0
+
+    while True:
+        m = search(buf, pos)
+        if m is None:
+            break
+        start, end = m.span()
+        pos = end
+        tok = buf[start]
+
+        if tok == QUOTE:
+            if not stack or not stack[-1].is_object:
+                continue
+            colon = COLON_RE.match(buf, end)
+            if not colon:
+                continue  # a string value, not a key
+            top = stack[-1]
+            vs = colon.end()
+            depth = len(stack)
+
+            if top.record == ('segment',) and buf[start:end] == SEGMENT_ID_KEY:
+                v = search(buf, vs) if buf[vs] == QUOTE else SCALAR_RE.match(buf, vs)
+                if not v:
+                    raise ValueError(f"unparseable segment_id at byte {vs}")
+                segment_id = json.loads(buf[v.start():v.end()])
+                # Index keys are JSON object keys: numeric ids are stored as their text, null as no id
+                top.segment_id = None if segment_id is None else str(segment_id)
+                pos = v.end()
+                continue
+            if depth > 2:
+                if buf[vs] == OPEN_ARRAY:
+                    a = NUMERIC_ARRAY_RE.match(buf, vs)
+                    if a and a.group().count(b'[') == a.group().count(b']'):
+                        pos = a.end()
+                continue
+
+            key = json.loads(buf[start:end])
+            record = ('section', key) if depth == 1 else ('child', stack[1].key, key)
+            if buf[vs] in (OPEN_OBJECT, OPEN_ARRAY):
+                pending = (vs, key, record)
+            elif buf[vs] == QUOTE:
+                v = search(buf, vs)
+                store(sections, children, record, [v.start(), v.end()])
+                pos = v.end()
+            else:
+                s = SCALAR_RE.match(buf, vs)
+                if not s:
+                    raise ValueError(f"unparseable value at byte {vs}")
+                store(sections, children, record, [vs, s.end()])
+            continue
+
+        if tok in (OPEN_OBJECT, OPEN_ARRAY):
+            key = record = None
+            if pending and pending[0] == start:
+                _, key, record = pending
+            elif stack and stack[-1].is_segments and tok == OPEN_OBJECT:
+                record = ('segment',)
+            pending = None
+            is_segments = tok == OPEN_ARRAY and key == SEGMENTS_KEY
+            if is_segments and segments_path is None:
+                segments_path = '.'.join([f.key for f in stack[1:]] + [key])
+            if record and record[0] == 'section' and tok == OPEN_OBJECT:
+                children.setdefault(key, {})
+            stack.append(Frame(start, tok == OPEN_OBJECT, key, record, is_segments))
+            continue
+
+        frame = stack.pop()
+        if frame.record is None:
+            continue
+        if frame.record == ('segment',):
+            if frame.segment_id is not None:
+                segment_ids[frame.segment_id] = [frame.start, end]
+        else:
+            store(sections, children, frame.record, [frame.start, end])
+
+    if stack:
+        raise ValueError("truncated JSON: unclosed container at byte "
+                         f"{stack[-1].start}")
+    return {'sections': sections, 'children': children,
+            'segments': {'path': segments_path, 'ids': segment_ids}}
+
+
+def store(sections, children, record, span):
+    if record[0] == 'section':
+        sections[record[1]] = span
+    else:
+        children.setdefault(record[1], {})[record[2]] = span
+
+
+def index_path(path):
+    path = Path(path)
+    return path.with_name(path.name + '.idx.json')
+
+
+def load_or_build_index(path, rebuild=False):
+    """Read <path>.idx.json if it matches the file's size/mtime, else rebuild and save it."""
+    path = Path(path)
+    st = path.stat()
+    idx_path = index_path(path)
+    if not rebuild and idx_path.exists():
+        with open(idx_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if (index.get('version') == INDEX_VERSION and index.get('size') == st.st_size
+                and index.get('mtime_ns') == st.st_mtime_ns):
+            return index
+
+    t0 = time.perf_counter()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        index = build_index(buf)
+    index.update(version=INDEX_VERSION, source=path.name, size=st.st_size, mtime_ns=st.st_mtime_ns)
+    with open(idx_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+    print(f"[INDEX] {path.name}: {len(index['sections'])} sections, "
+          f"{len(index['segments']['ids'])} segments in {time.perf_counter() - t0:.2f}s -> {idx_path.name}")
+    return index
+
+
+class LazyBundle:
+    """
+    Read-only view of a bundle (or geometry.json) backed by mmap + byte index.
+    Only the requested fragment is parsed; nothing is cached.
+    """
+
+    def __init__(self, path, rebuild=False):
+        self.path = Path(path)
+        self.index = load_or_build_index(self.path, rebuild)
+        self._file = open(self.path, 'rb')
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def raw(self, span):
+        """Bytes of one indexed span."""
+        start, end = span
+        return self._buf[start:end]
+
+    def _parse(self, span):
+        return json.loads(self.raw(span))
+
+    def sections(self):
+        return list(self.index['sections'])
+
+    def __contains__(self, section):
+        return section in self.index['sections']
+
+    def section(self, name):
+        """Parse one whole top-level section."""
+        return self._parse(self.index['sections'][name])
+
+    def keys(self, section):
+        """Keys of a top-level object section, without parsing it."""
+        return list(self.index['children'].get(section, {}))
+
+    def get(self, section, key, default=None):
+        """Parse section[key] only (e.g. get('flow_kg_by_poe', 'hidalgo_pharr'))."""
+        span = self.index['children'].get(section, {}).get(key)
+        return default if span is None else self._parse(span)
+
+    def segment_ids(self):
+        return list(self.index['segments']['ids'])
+
+    def segment(self, segment_id):
+        """Parse one segments_in_roi entry by segment_id. KeyError if absent."""
+        return self._parse(self.index['segments']['ids'][segment_id])
+
+    def segments(self, segment_ids=None):
+        """Iterate entries (all, or the given ids) in file order."""
+        ids = self.index['segments']['ids']
+        spans = sorted(ids[s] for s in segment_ids) if segment_ids is not None else sorted(ids.values())
+        for span in spans:
+            yield self._parse(span)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build byte-offset indexes for bundle JSON files')
+    parser.add_argument('files', nargs='+', help='Bundle or geometry.json files')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore existing .idx.json files')
+    parser.add_argument('--segment', help='Print one segment by segment_id (timing the lookup)')
+    args = parser.parse_args()
+
+    for f in args.files:
+        with LazyBundle(f, args.rebuild) as bundle:
+            seg_path = bundle.index['segments']['path']
+            print(f"  {f}: sections={bundle.sections()} segments={len(bundle.segment_ids())} ({seg_path})")
+            if args.segment:
+                t0 = time.perf_counter()
+                seg = bundle.segment(args.segment)
+                dt_us = (time.perf_counter() - t0) * 1e6
+                print(f"  {args.segment}: {len(seg.get('geometry_coordinates', []))} vertices, "
+                      f"lookup {dt_us:.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
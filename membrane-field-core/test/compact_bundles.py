@@ -1,7 +1,18 @@
 #!/usr/bin/env python3
-"""Compact JSON bundles for GitHub (<100MB limit)"""
+"""Compact JSON bundles for GitHub (<100MB limit)
+
+Publishes each bundle into manifest.json unless --no-manifest is given. When
+externalize_geometry.js runs afterwards it rewrites the bundles and
+republishes them itself, so pass --no-manifest there to skip the extra copy.
+"""
+import argparse
 import json
 import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from asset_manifest import publish
+from prune_bundles import MASS_TOLERANCE, prune_bundle, write_report
 
 def round_coords(coords, decimals=4):
     """Round coordinate arrays to N decimals"""
@@ -21,7 +32,7 @@ def round_nested(obj):
         return round(obj)
     return obj
 
-def compact_bundle(path):
+def compact_bundle(path, manifest=True):
     print(f"Processing: {path}")
 
     with open(path, 'r') as f:
@@ -44,19 +55,36 @@ def compact_bundle(path):
         if section in data:
             data[section] = round_nested(data[section])
 
+    # Drop zero / near-zero flow entries (per-POE and per-segment totals kept within MASS_TOLERANCE)
+    reports = prune_bundle(data)
+    for section, r in reports.items():
+        print(f"  {section}: pruned {r['removed']}/{r['entries']} entries, {r['mass_removed']:.0f} kg")
+
     # Write compact (no whitespace)
     with open(path, 'w') as f:
         json.dump(data, f, separators=(',', ':'))
 
     new_size = len(json.dumps(data, separators=(',', ':')))
     print(f"  {original_size/1_000_000:.1f} MB -> {new_size/1_000_000:.1f} MB ({100*(1-new_size/original_size):.0f}% reduction)")
+    if reports:
+        print(f"  Prune report: {write_report(path, MASS_TOLERANCE, reports).name}")
+
+    # Content-hashed copy + manifest.json entry for immutable browser caching
+    if manifest:
+        publish(path)
+
+FILES = [
+    r'C:\Users\pablo\projects\obsestra-web\membrane-field-core\test\bundle_baseline.json',
+    r'C:\Users\pablo\projects\obsestra-web\membrane-field-core\test\bundle_baseline_LAYER_A.json',
+    r'C:\Users\pablo\projects\obsestra-web\membrane-field-core\test\interserrana_bundle.json',
+]
 
 if __name__ == '__main__':
-    files = [
-        r'C:\Users\pablo\projects\obsestra-web\membrane-field-core\test\bundle_baseline.json',
-        r'C:\Users\pablo\projects\obsestra-web\membrane-field-core\test\bundle_baseline_LAYER_A.json',
-        r'C:\Users\pablo\projects\obsestra-web\membrane-field-core\test\interserrana_bundle.json',
-    ]
-    for f in files:
-        compact_bundle(f)
+    parser = argparse.ArgumentParser(description='Compact bundle JSON in place')
+    parser.add_argument('files', nargs='*', default=FILES, help='Bundles to compact (default: the three test bundles)')
+    parser.add_argument('--no-manifest', action='store_true',
+                        help='Do not publish a content-hashed copy into manifest.json')
+    args = parser.parse_args()
+    for f in args.files:
+        compact_bundle(f, manifest=not args.no_manifest)
     print("Done!")
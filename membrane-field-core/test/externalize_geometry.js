@@ -5,11 +5,17 @@
  * Before: 3 bundles × 83 MB = 246 MB (geometry duplicated 3x)
  * After:  1 geometry.json (47 MB) + 3 bundles × 36 MB = 155 MB
  *
- * Run: node externalize_geometry.js
+ * Run: node externalize_geometry.js [--no-manifest]
+ *
+ * Rewrites the bundles in place, so geometry.json and every rewritten bundle
+ * are republished into manifest.json afterwards (scripts/asset_manifest.py);
+ * otherwise the manifest keeps pointing at the old hashed copies, which the
+ * browser caches as immutable.
  */
 
 const fs = require('fs');
 const path = require('path');
+const { execFileSync } = require('child_process');
 
 const TEST_DIR = __dirname;
 
@@ -21,6 +27,17 @@ const BUNDLE_FILES = [
 
 const GEOMETRY_FILE = 'geometry.json';
 
+const ASSET_MANIFEST = path.join(TEST_DIR, '..', 'scripts', 'asset_manifest.py');
+const PYTHON = process.env.PYTHON || 'python';
+
+/**
+ * Publish content-hashed copies of the given test/ files into manifest.json.
+ * @param {string[]} files - File names relative to TEST_DIR
+ */
+function publish(files) {
+    execFileSync(PYTHON, [ASSET_MANIFEST, ...files.map(f => path.join(TEST_DIR, f))], { stdio: 'inherit' });
+}
+
 function main() {
     console.log('=== Externalize Geometry ===\n');
 
@@ -63,6 +80,14 @@ function main() {
         console.log(`  ${(beforeSize / 1e6).toFixed(2)} MB -> ${(afterSize / 1e6).toFixed(2)} MB (${reduction}% reduction)\n`);
     }
 
+    // Step 4: Republish everything written above
+    if (process.argv.includes('--no-manifest')) {
+        console.log('Skipping manifest (--no-manifest). Publish later with:');
+        console.log(`  python ../scripts/asset_manifest.py ${[GEOMETRY_FILE, ...BUNDLE_FILES].join(' ')}\n`);
+    } else {
+        publish([GEOMETRY_FILE, ...BUNDLE_FILES]);
+    }
+
     console.log('=== Done ===');
     console.log('\nNext: Update testBundle.html to load geometry.json separately');
     console.log('See the loader code that needs to be added.');
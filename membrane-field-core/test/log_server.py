@@ -3,20 +3,29 @@
 Then open testBundle.html in browser. Logs written to debug.log
 """
 
+import argparse
 import http.server
 import json
+import sys
 from datetime import datetime
 from pathlib import Path
 
+# Batch parsing and timestamp validation shared with the main log server
+# (this file runs as __main__, so the import resolves to ../log_server.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from log_server import format_ts, parse_batch
+
 LOG_FILE = Path(__file__).parent / "debug.log"
 PORT = 9999
 
+
 class LogHandler(http.server.BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Max-Age", "86400")
         self.end_headers()
 
     def do_POST(self):
@@ -33,8 +42,7 @@ class LogHandler(http.server.BaseHTTPRequestHandler):
             body = self.rfile.read(content_length).decode("utf-8")
             try:
                 data = json.loads(body)
-                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                line = f"[{timestamp}] {data['msg']}\n"
+                line = f"[{format_ts()}] {data['msg']}\n"
                 with open(LOG_FILE, "a") as f:
                     f.write(line)
                 self.send_response(200)
@@ -48,6 +56,26 @@ class LogHandler(http.server.BaseHTTPRequestHandler):
                 self.wfile.write(str(e).encode())
             return
 
+        if self.path == "/log/batch":
+            content_length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(content_length).decode("utf-8")
+            try:
+                # Debug log keeps everything: no pattern filter, one write per batch
+                entries = parse_batch(body)
+                lines = "".join(f"[{format_ts(ts)}] {msg}\n" for msg, ts in entries)
+                with open(LOG_FILE, "a") as f:
+                    f.write(lines)
+                self.send_response(200)
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(b"ok")
+            except Exception as e:
+                self.send_response(400)
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(str(e).encode())
+            return
+
         self.send_response(404)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
@@ -56,6 +84,12 @@ class LogHandler(http.server.BaseHTTPRequestHandler):
         pass  # Suppress default logging
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Debug log server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--logfile", type=Path, default=LOG_FILE)
+    args = parser.parse_args()
+    PORT, LOG_FILE = args.port, args.logfile
+
     LOG_FILE.write_text(f"=== Debug Log Started: {datetime.now().isoformat()} ===\n\n")
     print(f"Log server running on http://localhost:{PORT}")
     print(f"Logs will be written to: {LOG_FILE}")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Drop exact zeros and near-zero noise from bundle flow sections and queue results.
+
+An entry is a candidate when it is 0, or |v| <= abs threshold, or
+|v| <= rel threshold * its group total (per POE / destination).
+Candidates are removed smallest first, and only while every group the entry
+belongs to stays within its mass budget, max(MASS_TOLERANCE * group total,
+floor), where floor is the rule's absolute mass floor:
+
+    segment_load_kg_by_poe_hs2[poe][hs2][seg]          groups: poe, segment
+    segment_load_kg_by_destination_hs2[dest][hs2][seg] groups: destination, segment
+    queue results ["<hour>"][poe]                      groups: poe (sum over hours)
+    queue results _decomposed["<hour>"][poe][part]     groups: poe + part (sum over hours)
+
+So every per-POE / per-segment total changes by at most that budget. The floor
+lets groups that hold nothing but noise (a POE whose queue is 1e-9 min all day)
+be cleared entirely, where a purely relative budget would keep all of it.
+First-level keys (POEs, destinations, hours) are always kept, even when empty,
+because consumers test for them; missing leaves already read as 0
+(segmentWeights sums with +=, queueTimeSeries uses `|| 0`,
+queue_arrays reads parts with .get). _meta is left untouched.
+
+Usage:
+    python test/prune_bundles.py test/bundle_baseline.json test/bundle_baseline_queue_results.json
+    python test/prune_bundles.py --dry-run --tolerance 1e-5 test/interserrana_bundle_queue_results.json
+
+Writes files in place plus <stem>.prune_report.json (removed entries and mass per section).
+"""
+import argparse
+import json
+from pathlib import Path
+
+MASS_TOLERANCE = 1e-6   # max relative change of any group total
+
+# Per section: abs threshold and mass floor (in the section's unit), rel threshold (x group total)
+SECTION_RULES = {
+    'segment_load_kg_by_poe_hs2': {'abs': 1.0, 'rel': 1e-9, 'floor': 1.0, 'groups': ('poe', 'segment')},
+    'segment_load_kg_by_destination_hs2': {'abs': 1.0, 'rel': 1e-9, 'floor': 1.0,
+                                           'groups': ('destination', 'segment')},
+}
+QUEUE_RULE = {'abs': 1e-3, 'rel': 1e-9, 'floor': 1e-3, 'groups': ('poe',)}   # minutes
+
+
+def iter_leaves(obj, path=()):
+    """(path, value) for every numeric leaf reachable through dicts."""
+    for k, v in obj.items():
+        if isinstance(v, dict):
+            yield from iter_leaves(v, path + (k,))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            yield path + (k,), v
+
+
+def group_keys(path, groups):
+    """First group is keyed by the first path element, 'segment' by the last."""
+    return [(name, path[-1] if name == 'segment' else path[0]) for name in groups]
+
+
+def select(leaves, rule, tolerance):
+    """
+    Choose which leaves to drop. Returns (drop paths, report dict).
+    Greedy smallest-first under a per-group mass budget of
+    max(tolerance * group total, rule floor).
+    """
+    totals = {}
+    for path, v in leaves:
+        for g in group_keys(path, rule['groups']):
+            totals[g] = totals.get(g, 0.0) + abs(v)
+
+    candidates = []
+    for path, v in leaves:
+        primary = group_keys(path, rule['groups'])[0]
+        if v == 0 or abs(v) <= rule['abs'] or abs(v) <= rule['rel'] * totals[primary]:
+            candidates.append((abs(v), path, v))
+    candidates.sort(key=lambda c: c[0])
+
+    budget = {g: max(tolerance * t, rule['floor']) for g, t in totals.items()}
+    removed = {g: 0.0 for g in totals}
+    drop = []
+    zeros = 0
+    kept_over_budget = 0
+    for mag, path, v in candidates:
+        keys = group_keys(path, rule['groups'])
+        if mag > 0 and any(budget[g] < mag for g in keys):
+            kept_over_budget += 1
+            continue
+        for g in keys:
+            budget[g] -= mag
+            removed[g] += v
+        drop.append(path)
+        zeros += v == 0
+
+    worst_group, worst_err = None, 0.0
+    for g, r in removed.items():
+        err = abs(r) / totals[g] if totals[g] else 0.0
+        if err > worst_err:
+            worst_group, worst_err = g, err
+
+    report = {
+        'entries': len(leaves),
+        'removed': len(drop),
+        'removed_zeros': zeros,
+        'kept_over_budget': kept_over_budget,
+        'mass_total': sum(v for _, v in leaves),
+        'mass_removed': sum(removed[g] for g in totals if g[0] == rule['groups'][0]),
+        'max_group_rel_change': worst_err,
+        'max_group': f"{worst_group[0]}:{worst_group[1]}" if worst_group else None,
+        'max_group_abs_change': max((abs(r) for r in removed.values()), default=0.0),
+        'abs_threshold': rule['abs'],
+        'rel_threshold': rule['rel'],
+        'mass_floor': rule['floor'],
+    }
+    return drop, report
+
+
+def remove_paths(obj, paths, keep_depth=1):
+    """Delete leaf paths, then empty dicts deeper than keep_depth."""
+    for path in paths:
+        node = obj
+        for k in path[:-1]:
+            node = node[k]
+        del node[path[-1]]
+
+    def sweep(node, depth):
+        for k in list(node):
+            v = node[k]
+            if isinstance(v, dict):
+                sweep(v, depth + 1)
+                if not v and depth >= keep_depth:
+                    del node[k]
+    sweep(obj, 0)
+
+
+def prune_bundle(data, tolerance=MASS_TOLERANCE, rules=SECTION_RULES):
+    """Prune flow sections of a bundle in place. Returns {section: report}."""
+    reports = {}
+    for section, rule in rules.items():
+        if section not in data:
+            continue
+        leaves = list(iter_leaves(data[section]))
+        drop, reports[section] = select(leaves, rule, tolerance)
+        remove_paths(data[section], drop)
+    return reports
+
+
+def prune_queue_results(data, tolerance=MASS_TOLERANCE, rule=QUEUE_RULE):
+    """
+    Prune hour -> POE entries and the _decomposed parts of a queue results
+    dict in place. Returns {'hours': report, '_decomposed': report}.
+    """
+    hours = {k: v for k, v in data.items() if not k.startswith('_')}
+    # Paths start with the group key (POE) so totals sum over hours
+    leaves = [((poe, h), v) for h, poes in hours.items() for poe, v in poes.items()]
+    drop, report = select(leaves, rule, tolerance)
+    reports = {'hours': report}
+    for poe, h in drop:
+        del data[h][poe]
+
+    if '_decomposed' in data:
+        decomposed = data['_decomposed']
+        leaves = [(((poe, part), h), v) for h, poes in decomposed.items()
+                  for poe, parts in poes.items() for part, v in parts.items()]
+        drop, reports['_decomposed'] = select(leaves, rule, tolerance)
+        for (poe, part), h in drop:
+            del decomposed[h][poe][part]
+    return reports
+
+
+def write_report(path, tolerance, reports):
+    """<stem>.prune_report.json next to path. Returns the report path."""
+    path = Path(path)
+    report_path = path.with_name(path.stem + '.prune_report.json')
+    with open(report_path, 'w') as f:
+        json.dump({'source': path.name, 'tolerance': tolerance, 'sections': reports}, f, indent=2)
+    return report_path
+
+
+def is_queue_results(data):
+    return '_meta' in data and '0' in data and isinstance(data['0'], dict)
+
+
+def prune_file(path, tolerance=MASS_TOLERANCE, dry_run=False):
+    path = Path(path)
+    print(f"Pruning: {path}")
+    with open(path, 'r') as f:
+        data = json.load(f)
+    original_size = path.stat().st_size
+
+    if is_queue_results(data):
+        reports = prune_queue_results(data, tolerance)
+    else:
+        reports = prune_bundle(data, tolerance)
+
+    for section, r in reports.items():
+        print(f"  {section}: removed {r['removed']}/{r['entries']} entries ({r['removed_zeros']} zeros), "
+              f"mass {r['mass_removed']:.6g} of {r['mass_total']:.6g}, "
+              f"max group change {r['max_group_rel_change']:.2e} ({r['max_group']}), "
+              f"max abs {r['max_group_abs_change']:.2e}")
+    if dry_run:
+        return reports
+
+    with open(path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    new_size = path.stat().st_size
+    print(f"  {original_size/1_000_000:.2f} MB -> {new_size/1_000_000:.2f} MB")
+
+    write_report(path, tolerance, reports)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prune zero and near-zero entries from bundles and queue results')
+    parser.add_argument('files', nargs='+', help='Bundle or *_queue_results.json files (rewritten in place)')
+    parser.add_argument('--tolerance', type=float, default=MASS_TOLERANCE,
+                        help='Max relative change of any POE / destination / segment total '
+                             '(groups below the absolute mass floor may be cleared)')
+    parser.add_argument('--dry-run', action='store_true', help='Report only, do not write')
+    args = parser.parse_args()
+
+    for f in args.files:
+        prune_file(f, args.tolerance, args.dry_run)
+    print("Done!")
+
+
+if __name__ == '__main__':
+    main()
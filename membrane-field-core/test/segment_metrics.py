@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Precompute segment polyline metrics for a bundle's segments_in_roi.
+
+Projects every segment once into the PHARR world frame (same transform as
+bundleConsumer.latLonToWorld) and writes a sidecar <bundle>.segmetrics.json:
+
+    {"version": 2, "source": "...", "transform": {...},
+     "roi": {"centerX", "centerY", "sizeM", "N"},
+     "segments": {"<segment_id>": {
+         "length_m": 3352.1,
+         "bbox":   [minX, minY, maxX, maxY],   world meters, rounded outward to 0.1 m
+         "cells":  [gap, count, ...],          run-length encoded road cells (y * N + x)
+         "cum_m":  [0, 21.9, ...],             per-vertex cumulative distance (m)
+         "xy":     [x0, y0, x1, y1, ...]}}}    world meters (0.1 m), only with --points
+
+Cells are the K-tensor road footprint exactly as reynosaOverlay_v2.bakeKTensor
+stamps it (in-ROI test, 2 samples per cell along each edge, 3x3 kernel), so
+the overlay can stamp them directly (overlay/segmentMetrics.js) instead of
+resampling every segment on each load. Runs are over sorted cell indices,
+each gap counted from the end of the previous run.
+The default ROI is the field's: centered CENTER_OFFSET_Y south of PHARR,
+COMPUTE_WINDOW.SIZE_M wide, COMPUTE_WINDOW.RESOLUTION cells per side.
+PHARR and the transform come from the file itself, or from --frame (the city
+bundle has no pharr_coords: build it against geometry.json, as testBundle
+projects it).
+
+Usage:
+    python test/segment_metrics.py test/geometry.json
+    python test/segment_metrics.py test/reynosa_city_bundle.json --frame test/geometry.json
+"""
+import argparse
+import json
+import math
+import time
+from pathlib import Path
+
+from bundle_index import LazyBundle
+
+# contracts/ReynosaOverlayBundle.js PHARR_DEFAULTS / RENDERER_TRANSFORM
+PHARR_LAT = 26.06669701044433
+PHARR_LON = -98.20517760083658
+METERS_PER_DEG_LAT = 111320
+DEFAULT_TRANSFORM = {
+    'origin_lat': PHARR_LAT,
+    'origin_lon': PHARR_LON,
+    'meters_per_deg_lat': METERS_PER_DEG_LAT,
+    'meters_per_deg_lon': METERS_PER_DEG_LAT * math.cos(PHARR_LAT * math.pi / 180),
+}
+
+# spec/renderer_interfaces.js COMPUTE_WINDOW / REYNOSA_ACTIVATION
+ROI_SIZE_M = 80000
+ROI_RESOLUTION = 4800
+CENTER_OFFSET_Y = -15000
+
+METRICS_VERSION = 2
+
+
+def sidecar_path(path):
+    path = Path(path)
+    return path.with_name(path.with_suffix('').name + '.segmetrics.json')
+
+
+def default_roi(transform, pharr=None, size_m=ROI_SIZE_M, n=ROI_RESOLUTION, offset_y=CENTER_OFFSET_Y):
+    """ROI as reynosaOverlay_v2.onAttach sets it up: centered offset_y from PHARR."""
+    lat, lon = (pharr['lat'], pharr['lon']) if pharr else (PHARR_LAT, PHARR_LON)
+    (px, py), = project([(lat, lon)], transform)
+    return {'centerX': px, 'centerY': py + offset_y, 'sizeM': size_m, 'N': n}
+
+
+def read_frame(bundle):
+    """(transform, pharr_coords) of an open LazyBundle (full bundle or geometry.json)."""
+    if 'geometry' in bundle:
+        transform = bundle.get('geometry', 'transform')
+        pharr = bundle.get('geometry', 'pharr_coords')
+    else:
+        transform = bundle.section('transform') if 'transform' in bundle else None
+        pharr = bundle.section('pharr_coords') if 'pharr_coords' in bundle else None
+    return transform or DEFAULT_TRANSFORM, pharr
+
+
+def project(coords, transform):
+    """[[lat, lon], ...] -> [(x, y), ...] world meters."""
+    olat, olon = transform['origin_lat'], transform['origin_lon']
+    mlat, mlon = transform['meters_per_deg_lat'], transform['meters_per_deg_lon']
+    return [((lon - olon) * mlon, (lat - olat) * mlat) for lat, lon in coords]
+
+
+def stamp_cells(points, roi):
+    """Sorted unique road cells reynosaOverlay_v2.bakeKTensor stamps for the polyline."""
+    n = roi['N']
+    cx, cy, size = roi['centerX'], roi['centerY'], roi['sizeM']
+    cell_size = size / n
+    if not any(abs(x - cx) < size and abs(y - cy) < size for x, y in points):
+        return []
+    cells = set()
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        length = math.hypot(x2 - x1, y2 - y1)
+        if length < 0.001:
+            continue
+        steps = math.ceil(length / cell_size * 2)
+        for s in range(steps + 1):
+            t = s / steps
+            fx = ((x1 + (x2 - x1) * t - cx) / size + 0.5) * n
+            fy = ((y1 + (y2 - y1) * t - cy) / size + 0.5) * n
+            for ry in (-1, 0, 1):
+                for rx in (-1, 0, 1):
+                    ix, iy = math.floor(fx + rx), math.floor(fy + ry)
+                    if 0 <= ix < n and 0 <= iy < n:
+                        cells.add(iy * n + ix)
+    return sorted(cells)
+
+
+def run_length(cells):
+    """
+    Sorted cell indices -> flat [gap, count, gap, count, ...], each gap counted
+    from the end of the previous run (the first from 0), so a road crossing
+    rows stores ~N instead of absolute indices.
+    """
+    runs = []
+    end = 0
+    for c in cells:
+        if runs and c == end:
+            runs[-1] += 1
+        else:
+            runs.extend((c - end, 1))
+        end = c + 1
+    return runs
+
+
+def expand_runs(runs):
+    """Inverse of run_length."""
+    cells = []
+    end = 0
+    for gap, count in zip(runs[::2], runs[1::2]):
+        start = end + gap
+        cells.extend(range(start, start + count))
+        end = start + count
+    return cells
+
+
+def segment_metrics(coords, transform, roi, points=False):
+    pts = project(coords, transform)
+    cum = [0.0]
+    for (x0, y0), (x1, y1) in zip(pts, pts[1:]):
+        cum.append(cum[-1] + math.hypot(x1 - x0, y1 - y0))
+    xs = [p[0] for p in pts]
+    ys = [p[1] for p in pts]
+    entry = {
+        'length_m': round(cum[-1], 1),
+        # Outward rounding keeps every vertex inside the stored box
+        'bbox': [math.floor(min(xs) * 10) / 10, math.floor(min(ys) * 10) / 10,
+                 math.ceil(max(xs) * 10) / 10, math.ceil(max(ys) * 10) / 10],
+        'cells': run_length(stamp_cells(pts, roi)),
+        'cum_m': [round(d, 1) for d in cum],
+    }
+    if points:
+        entry['xy'] = [round(v, 1) for p in pts for v in p]
+    return entry
+
+
+def build_sidecar(path, roi_size=ROI_SIZE_M, n=ROI_RESOLUTION, offset_y=CENTER_OFFSET_Y, points=False,
+                  frame=None):
+    t0 = time.perf_counter()
+    if frame:
+        with LazyBundle(frame) as frame_bundle:
+            transform, pharr = read_frame(frame_bundle)
+    with LazyBundle(path) as bundle:
+        if not frame:
+            transform, pharr = read_frame(bundle)
+        roi = default_roi(transform, pharr, roi_size, n, offset_y)
+
+        segments = {}
+        cells_total = 0
+        for seg in bundle.segments():
+            coords = seg.get('geometry_coordinates') or []
+            if not coords:
+                continue
+            entry = segment_metrics(coords, transform, roi, points)
+            cells_total += sum(entry['cells'][1::2])
+            segments[seg['segment_id']] = entry
+
+    out = sidecar_path(path)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'version': METRICS_VERSION, 'source': Path(path).name,
+                   'transform': transform, 'roi': roi, 'segments': segments},
+                  f, separators=(',', ':'))
+    print(f"  {Path(path).name}: {len(segments)} segments, {cells_total} cells "
+          f"-> {out.name} ({out.stat().st_size / 1e6:.1f} MB, {time.perf_counter() - t0:.1f}s)")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write segment length/bbox/cell-coverage sidecars for bundles')
+    parser.add_argument('files', nargs='+', help='Bundles or geometry.json')
+    parser.add_argument('--roi-size', type=float, default=ROI_SIZE_M, help='ROI width in meters')
+    parser.add_argument('--n', type=int, default=ROI_RESOLUTION, help='Field cells per side')
+    parser.add_argument('--center-offset-y', type=float, default=CENTER_OFFSET_Y,
+                        help='ROI center offset from PHARR in meters (negative = south)')
+    parser.add_argument('--points', action='store_true',
+                        help='Also store projected vertices (xy); adds roughly 60%% to the sidecar')
+    parser.add_argument('--frame', help='Take transform and PHARR from this bundle / geometry.json '
+                                        '(default: each file\'s own)')
+    args = parser.parse_args()
+
+    for f in args.files:
+        build_sidecar(f, args.roi_size, args.n, args.center_offset_y, args.points, args.frame)
+    print("Done!")
+
+
+if __name__ == '__main__':
+    main()